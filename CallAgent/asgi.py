@@ -8,15 +8,22 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-import src.routing
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CallAgent.settings")
 
+# Set up Django before importing anything that touches models.
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+import src.routing  # noqa: E402
+from src.apps import start_knowledge_base_warm_up  # noqa: E402
+
+start_knowledge_base_warm_up()
+
 application = ProtocolTypeRouter(
     {
-        "http": get_asgi_application(),
+        "http": django_asgi_app,
         "websocket": AuthMiddlewareStack(URLRouter(src.routing.websocket_urlpatterns)),
     }
 )
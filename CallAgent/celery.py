@@ -10,8 +10,14 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 app.conf.beat_schedule = {
     'mark-unresolved-task': {
-        'task': 'src.tasks.mark_unresolved_if_expired',  
-        'schedule': 60.0,  
+        'task': 'src.tasks.mark_unresolved_if_expired',
+        # Each query schedules its own expire_query task; this sweep only
+        # reconciles deadlines whose task was lost.
+        'schedule': 15 * 60.0,
+    },
+    'prune-change-events-task': {
+        'task': 'src.tasks.prune_change_events',
+        'schedule': 60 * 60.0,
     },
 }
 
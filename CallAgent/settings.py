@@ -39,9 +39,21 @@ INSTALLED_APPS = [
 
 ASGI_APPLICATION = "CallAgent.asgi.application"
 
+# Redis layer, so change events recorded in Celery workers and other ASGI
+# workers reach every connected dashboard, not only their own process.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": ["redis://localhost:6379/1"],
+        },
+    },
+}
+
 APPEND_SLASH = True
 
 MIDDLEWARE = [
+    'src.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -142,6 +154,53 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC' 
 CELERY_TASK_TRACK_STARTED = True
+# Redis redelivers unacknowledged tasks after the visibility timeout, so it must
+# outlast the longest expire_query ETA or every deadline task runs twice.
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 12 * 60 * 60}
+
+# Knowledge Base Configuration
+KNOWLEDGE_BASE_INFO_CACHE_TTL = 300  # seconds before salon information is reloaded
+KNOWLEDGE_BASE_WARM_UP = True  # build the search index when the ASGI/WSGI server starts
+KNOWLEDGE_BASE_FRESHNESS_INTERVAL = 1  # seconds between checks for knowledge written by other processes
+DEFAULT_TENANT = "default"  # salon used when a request does not name one
+KNOWLEDGE_BASE_MEMORY_BUDGET = 256 * 1024 * 1024  # approx. bytes of per-tenant indexes kept in memory
+KNOWLEDGE_BASE_MAX_TENANTS = 1000  # most tenants whose knowledge base is kept in memory
+KNOWLEDGE_BASE_STEM_TOKENS = False  # strip plural/-ing/-ed suffixes when normalizing questions
+KNOWLEDGE_BASE_SCORER = "jaccard"  # "jaccard" word overlap or "embedding" n-gram vectors
+KNOWLEDGE_BASE_EMBEDDING_DIM = 256  # dimensions of stored question vectors
+KNOWLEDGE_BASE_EMBEDDING_THRESHOLD = 0.5  # minimum cosine similarity for the embedding scorer
+KNOWLEDGE_BASE_VECTOR_DIR = None  # directory for memory-mapped vectors; system temp dir if None
+
+# Query Request Configuration
+QUERY_REQUEST_SLA = 2 * 60 * 60  # seconds a query may stay pending before it is marked unresolved
+QUERY_REQUEST_MAX_SLA = 24 * 60 * 60  # longest sla_seconds a create-query caller may ask for
+QUERY_EXPIRY_MAX_ETA = 6 * 60 * 60  # deadlines further out are left to the sweep; keep below visibility_timeout
+QUERY_EXPIRY_BATCH_SIZE = 500  # queries expired per transaction by the sweep
+QUERY_DEDUP_ENABLED = True  # attach repeats of a pending question to the existing query
+QUERY_DEDUP_NEAR_MATCHES = False  # also coalesce questions differing by a single stopword
+QUERY_DEDUP_INDEX_TTL = 60  # seconds before a process reloads its pending question index
+QUERY_AUTO_RESOLVE_ENABLED = True  # a supervisor answer also resolves pending queries asking the same
+QUERY_AUTO_RESOLVE_LIMIT = 500  # most pending queries resolved by one answer
+
+# Change Feed Configuration
+CHANGE_FEED_RETENTION = 7 * 24 * 60 * 60  # seconds change events are kept for dashboards to catch up
+CHANGE_FEED_PRUNE_BATCH_SIZE = 1000  # change events deleted per statement by the prune task
+CHANGE_FEED_LOOKBACK = 60  # seconds before ?since= re-read for events that committed late
+
+# Metrics Configuration
+METRICS_ENABLED = True  # record hot path timings and counters, served on /metrics
+METRICS_WORKER_PORT = None  # first port Celery worker processes serve /metrics on; None disables
+METRICS_HOST = "127.0.0.1"  # interface the worker metrics server binds to
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]  # client addresses allowed to read /metrics; None allows all
+
+# Notification Configuration
+NOTIFICATION_WEBHOOK_TIMEOUT = 5  # seconds per webhook request
+NOTIFICATION_BATCH_SIZE = 50  # notifications per webhook request
+NOTIFICATION_MAX_RETRIES = 5  # before a notification is dead-lettered
+NOTIFICATION_RETRY_BACKOFF = 2  # seconds, doubled after every retry
+NOTIFICATION_LOG_CAPACITY = 1000  # recent notifications kept in memory per process
+NOTIFICATION_LOG_FLUSH_SIZE = 100  # records per bulk insert into the persistent log
+NOTIFICATION_LOG_FLUSH_INTERVAL = 5  # max seconds a record waits before being persisted
 
 
 LANGUAGE_CODE = 'en-us'
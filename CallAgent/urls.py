@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from src.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('src.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
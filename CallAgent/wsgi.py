@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CallAgent.settings')
 
 application = get_wsgi_application()
+
+from src.apps import start_knowledge_base_warm_up  # noqa: E402
+
+start_knowledge_base_warm_up()
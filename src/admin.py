@@ -1,5 +1,6 @@
-from django.contrib import admin
-from src.models import User, QueryRequest, KnowledgeBase
+from django.contrib import admin, messages
+from src.knowledge_base.knowledge import get_knowledge_base
+from src.models import User, QueryRequest, KnowledgeBase, NotificationDeadLetter, NotificationLogEntry, ChangeEvent, QueryFollower
 
 # Register your models here.
 
@@ -14,18 +15,63 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(QueryRequest)
 class QueryRequestAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "question", "status", "created_at", "updated_at")
+    list_display = ("id", "user", "tenant", "question", "status", "follower_count", "created_at", "updated_at")
+    search_fields = ("question",)
+    list_filter = ("tenant", "status", "created_at")
+    ordering = ("-created_at",)
+    list_per_page = 10
+    date_hierarchy = "created_at"
+
+@admin.register(QueryFollower)
+class QueryFollowerAdmin(admin.ModelAdmin):
+    list_display = ("id", "query_request", "user", "question", "created_at")
     search_fields = ("question",)
-    list_filter = ("status", "created_at")
     ordering = ("-created_at",)
     list_per_page = 10
     date_hierarchy = "created_at"
 
 @admin.register(KnowledgeBase)
 class KnowledgeBaseAdmin(admin.ModelAdmin):
-    list_display = ("id", "question", "answer", "type", "source", "created_at", "updated_at")
+    list_display = ("id", "tenant", "question", "answer", "type", "source", "created_at", "updated_at")
     search_fields = ("question", "answer")
-    list_filter = ("type", "source", "created_at")
+    list_filter = ("tenant", "type", "source", "created_at")
     ordering = ("-created_at",)
     list_per_page = 10
-    date_hierarchy = "created_at"
\ No newline at end of file
+    date_hierarchy = "created_at"
+    actions = ("reload_knowledge_base",)
+
+    @admin.action(description="Reload knowledge base index and cache of the selected tenants")
+    def reload_knowledge_base(self, request, queryset):
+        for tenant in queryset.values_list("tenant", flat=True).distinct():
+            get_knowledge_base(tenant).reload()
+        self.message_user(request, "Knowledge base reloaded.", messages.SUCCESS)
+
+
+@admin.register(NotificationDeadLetter)
+class NotificationDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ("id", "destination", "attempts", "error", "created_at")
+    search_fields = ("destination", "error")
+    list_filter = ("destination", "created_at")
+    ordering = ("-created_at",)
+    list_per_page = 10
+    date_hierarchy = "created_at"
+
+
+@admin.register(NotificationLogEntry)
+class NotificationLogEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "type", "customer_id", "request_id", "sent_at")
+    search_fields = ("customer_id", "request_id")
+    list_filter = ("type", "sent_at")
+    ordering = ("-sent_at",)
+    list_per_page = 10
+    date_hierarchy = "sent_at"
+
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "model", "object_id", "action", "created_at")
+    search_fields = ("object_id",)
+    list_filter = ("model", "action", "created_at")
+    ordering = ("-id",)
+    list_per_page = 10
+    date_hierarchy = "created_at"
@@ -0,0 +1,93 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+API_BASE_URL = os.environ.get("CALLAGENT_API_URL", "http://127.0.0.1:8000/api").rstrip("/")
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5, connect=1)
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.1  # seconds, doubled after every attempt
+RETRY_STATUSES = {502, 503, 504}
+
+# One session per event loop: an aiohttp session cannot be used outside the
+# loop it was created in, and jobs sharing a worker process may each run
+# their own loop. Jobs hold their loop's session while running.
+_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+_session_holders: Dict[asyncio.AbstractEventLoop, int] = {}
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Return the running event loop's shared HTTP session. Connections to the
+    Django API are kept alive and reused across tool calls instead of opened
+    per request.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+            timeout=REQUEST_TIMEOUT,
+        )
+    return session
+
+
+def hold_session():
+    """Mark the running loop's session as in use by one more job."""
+    loop = asyncio.get_running_loop()
+    _session_holders[loop] = _session_holders.get(loop, 0) + 1
+
+
+async def release_session():
+    """
+    Release a job's hold on the running loop's session, closing it once no
+    job on this loop still uses it.
+    """
+    loop = asyncio.get_running_loop()
+    holders = _session_holders.get(loop, 0) - 1
+    if holders > 0:
+        _session_holders[loop] = holders
+        return
+    _session_holders.pop(loop, None)
+    session = _sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+async def request_json(
+    method: str,
+    path: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    json: Optional[Dict[str, Any]] = None,
+    idempotent: bool = True,
+) -> tuple[int, Any]:
+    """
+    Call the Django API and return (status, parsed JSON body).
+
+    Idempotent requests are retried with exponential backoff on timeouts,
+    connection errors and gateway errors. Non-idempotent ones are only retried
+    when the connection could not be opened, so nothing is sent twice.
+    """
+    url = f"{API_BASE_URL}/{path.lstrip('/')}"
+    attempt = 0
+    while True:
+        try:
+            async with get_session().request(method, url, params=params, json=json) as response:
+                if response.status in RETRY_STATUSES and idempotent and attempt < MAX_RETRIES:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status
+                    )
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+                return response.status, body
+        except (aiohttp.ClientConnectorError, asyncio.TimeoutError, aiohttp.ClientError) as e:
+            retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+            if not retryable or attempt >= MAX_RETRIES:
+                raise
+            await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+            attempt += 1
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from src.agents.http_client import request_json
+
+logger = logging.getLogger("app_logger")
+
+KNOWLEDGE_BACKEND = os.environ.get("KNOWLEDGE_BACKEND", "http")
+# Salon used when a room's metadata does not name one.
+DEFAULT_TENANT = os.environ.get("DEFAULT_TENANT", "default")
+# How often the embedded backend checks the database for knowledge changes.
+EMBEDDED_REFRESH_INTERVAL = float(os.environ.get("KNOWLEDGE_REFRESH_INTERVAL", "30"))
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """A search-query response as a JSON string, and whether it is an answer rather than an error."""
+
+    body: str
+    ok: bool = True
+
+    @classmethod
+    def error(cls, message: str = "Failed to query knowledge base") -> "SearchResult":
+        return cls(json.dumps({"error": message}), ok=False)
+
+
+class KnowledgeBackend:
+    """Where the agent's query_knowledge_base tool gets its answers from."""
+
+    async def search(self, query: str, tenant: str = DEFAULT_TENANT) -> SearchResult:
+        """Return the search-query response for `query` in a tenant's knowledge base."""
+        raise NotImplementedError
+
+    async def aclose(self):
+        """Release any resources held by the backend."""
+
+
+class HttpKnowledgeBackend(KnowledgeBackend):
+    """Queries the Django search-query endpoint over HTTP."""
+
+    async def search(self, query: str, tenant: str = DEFAULT_TENANT) -> SearchResult:
+        try:
+            status, data = await request_json(
+                "GET", "knowledge-base/search-query/", params={"query": query, "tenant": tenant}
+            )
+        except Exception as e:
+            print(f"Error querying knowledge base: {e}")
+            return SearchResult.error()
+        if status == 200:
+            return SearchResult(json.dumps(data))
+        else:
+            print(f"Error querying knowledge base: {status}")
+            return SearchResult.error()
+
+
+class EmbeddedKnowledgeBackend(KnowledgeBackend):
+    """
+    Answers from read-only copies of tenants' knowledge indexes held in the
+    agent process, skipping the HTTP hop to Django. A tenant's copy is loaded
+    in a thread on its first call and reloaded whenever its rows change,
+    checked every EMBEDDED_REFRESH_INTERVAL seconds, or when `refresh()` is
+    called. Copies are evicted least recently used under
+    KNOWLEDGE_BASE_MEMORY_BUDGET.
+    """
+
+    def __init__(self, refresh_interval: float = EMBEDDED_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._registry = None
+        self._fingerprints: Dict[str, Tuple[Any, ...]] = {}
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def search(self, query: str, tenant: str = DEFAULT_TENANT) -> SearchResult:
+        registry = self._registry
+        if registry is not None and registry.peek(tenant) is not None:
+            # Already loaded; get() also marks the tenant as recently used.
+            knowledge_base = registry.get(tenant)
+        else:
+            knowledge_base = await self.refresh(tenant)
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+        similar_entries = knowledge_base._find_similar_entries(query)
+        return SearchResult(
+            json.dumps(
+                {
+                    "similar_entries": similar_entries,
+                    "salon_information": knowledge_base.get_system_information(),
+                }
+            )
+        )
+
+    async def refresh(self, tenant: str = DEFAULT_TENANT, force: bool = False):
+        """Reload a tenant's snapshot if its rows changed since the last load, and return it."""
+        async with self._load_lock:
+            if self._registry is None:
+                self._registry = await asyncio.to_thread(self._create_registry)
+            fingerprint = await asyncio.to_thread(self._read_fingerprint, tenant)
+            knowledge_base = self._registry.peek(tenant)
+            if not force and knowledge_base is not None and fingerprint == self._fingerprints.get(tenant):
+                return knowledge_base
+            knowledge_base = await asyncio.to_thread(self._load, tenant)
+            self._registry.put(tenant, knowledge_base)
+            self._fingerprints[tenant] = fingerprint
+            logger.info(f"Loaded embedded knowledge base snapshot for {tenant}: {fingerprint}")
+            return knowledge_base
+
+    async def aclose(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def _refresh_periodically(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            tenants = self._registry.tenants()
+            # Forget fingerprints of tenants evicted since the last pass.
+            for tenant in set(self._fingerprints) - set(tenants):
+                self._fingerprints.pop(tenant, None)
+            for tenant in tenants:
+                try:
+                    await self.refresh(tenant)
+                except Exception as e:
+                    logger.error(f"Error refreshing embedded knowledge base for {tenant}: {e}")
+
+    @staticmethod
+    def _setup_django():
+        import django
+        from django.apps import apps
+
+        if not apps.ready:
+            os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CallAgent.settings")
+            django.setup()
+
+    def _create_registry(self):
+        self._setup_django()
+        from src.knowledge_base.knowledge import KnowledgeBaseRegistry
+
+        return KnowledgeBaseRegistry()
+
+    def _read_fingerprint(self, tenant: str) -> Tuple[Any, ...]:
+        """Cheap summary of a tenant's rows that changes on every insert, update or delete."""
+        self._setup_django()
+        from django.db import close_old_connections
+        from src.knowledge_base.knowledge import read_fingerprint
+
+        close_old_connections()
+        return read_fingerprint(tenant)
+
+    def _load(self, tenant: str):
+        self._setup_django()
+        from src.knowledge_base.knowledge import KnowledgeBase
+
+        # Never expire or check the database on its own: the refresh task
+        # replaces the snapshot as a whole on change, off the event loop.
+        knowledge_base = KnowledgeBase(
+            tenant=tenant, info_cache_ttl=float("inf"), freshness_interval=float("inf")
+        )
+        knowledge_base.warm_up()
+        return knowledge_base
+
+
+BACKENDS = {
+    "http": HttpKnowledgeBackend,
+    "embedded": EmbeddedKnowledgeBackend,
+}
+
+# One backend per event loop, like the HTTP sessions in http_client: the
+# embedded backend's lock and refresh task belong to the loop they run in.
+# Jobs hold their loop's backend while running.
+_backends: Dict[asyncio.AbstractEventLoop, KnowledgeBackend] = {}
+_backend_holders: Dict[asyncio.AbstractEventLoop, int] = {}
+
+
+def get_knowledge_backend() -> KnowledgeBackend:
+    """Return the running loop's knowledge backend, chosen by the KNOWLEDGE_BACKEND env var."""
+    loop = asyncio.get_running_loop()
+    backend = _backends.get(loop)
+    if backend is None:
+        try:
+            backend = _backends[loop] = BACKENDS[KNOWLEDGE_BACKEND]()
+        except KeyError:
+            raise ValueError(f"Unknown knowledge backend: {KNOWLEDGE_BACKEND}")
+    return backend
+
+
+def hold_knowledge_backend():
+    """Mark the running loop's knowledge backend as in use by one more job."""
+    loop = asyncio.get_running_loop()
+    _backend_holders[loop] = _backend_holders.get(loop, 0) + 1
+
+
+async def release_knowledge_backend():
+    """
+    Release a job's hold on the running loop's knowledge backend, closing it
+    once no job on this loop still uses it.
+    """
+    loop = asyncio.get_running_loop()
+    holders = _backend_holders.get(loop, 0) - 1
+    if holders > 0:
+        _backend_holders[loop] = holders
+        return
+    _backend_holders.pop(loop, None)
+    backend = _backends.pop(loop, None)
+    if backend is not None:
+        await backend.aclose()
@@ -1,41 +1,79 @@
 from livekit import agents
-from livekit.agents import function_tool
+from livekit.agents import RunContext, function_tool
 from livekit.agents import llm, RoomInputOptions
 from livekit.agents.voice import Agent, AgentSession
 from livekit.plugins import deepgram, openai, cartesia, silero, noise_cancellation
 import asyncio
 import json
-import requests
+import time
+from dataclasses import dataclass, field
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from src.agents.http_client import hold_session, release_session, request_json
+from src.agents.knowledge_backends import (
+    DEFAULT_TENANT,
+    SearchResult,
+    get_knowledge_backend,
+    hold_knowledge_backend,
+    release_knowledge_backend,
+)
+from src.agents.session_cache import SPECULATIVE_PREFETCH, RetrievalCache
+
+
+@dataclass
+class SessionData:
+    """Per-call state shared by the tools of one AgentSession."""
+
+    # Salon the call is for, taken from the job or room metadata.
+    tenant: str = DEFAULT_TENANT
+    retrieval_cache: RetrievalCache = field(
+        default_factory=lambda: RetrievalCache(is_cacheable=lambda result: result.ok)
+    )
+
+    async def search(self, query: str) -> SearchResult:
+        return await search_knowledge_base(query, self.tenant)
+
+
+async def search_knowledge_base(query: str, tenant: str = DEFAULT_TENANT) -> SearchResult:
+    return await get_knowledge_backend().search(query, tenant)
+
+
+def get_tenant(ctx: agents.JobContext) -> str:
+    """Read the salon from {"tenant": ...} in the dispatch or room metadata."""
+    for metadata in (ctx.job.metadata, ctx.job.room.metadata):
+        try:
+            tenant = json.loads(metadata or "{}").get("tenant")
+        except (ValueError, AttributeError):
+            continue
+        if tenant:
+            return tenant
+    return DEFAULT_TENANT
 
 
 @function_tool(
     name="query_knowledge_base",
     description="Query the knowledge base for salon information.",
 )
-async def query_knowledge_base(query: str) -> str:
+async def query_knowledge_base(context: RunContext[SessionData], query: str) -> str:
     print(f"Querying knowledge base with: {query}")
-    response = requests.get(
-        f"http://127.0.0.1:8000/api/knowledge-base/search-query/?query={query}"
-    )
-    if response.status_code == 200:
-        data = response.json()
-        return json.dumps(data)
-    else:
-        print(f"Error querying knowledge base: {response.status_code}")
-        return json.dumps({"error": "Failed to query knowledge base"})
+    result = await context.userdata.retrieval_cache.get_or_fetch(query, context.userdata.search)
+    return result.body
 
 
 @function_tool(
     name="notify_human_operator",
     description="Trigger this when AI doesn't know the answer and needs human help.",
 )
-async def notify_human_operator(message: str) -> None:
-
-    requests.post(
-        "http://127.0.0.1:8000/api/query-request/create-query/",
-        json={"user_id": "1", "question": message},
-    )
+async def notify_human_operator(context: RunContext[SessionData], message: str) -> None:
+    try:
+        await request_json(
+            "POST",
+            "query-request/create-query/",
+            json={"user_id": "1", "question": message, "tenant": context.userdata.tenant},
+            idempotent=False,
+        )
+    except Exception as e:
+        print(f"Error sending notification: {e}")
+        return
 
     print(f"Notification sent: {message}")
 
@@ -71,16 +109,48 @@ agent = Agent(
 )
 
 
-async def entrypoint(ctx: agents.JobContext):
+def prewarm(proc: agents.JobProcess):
+    """Load the VAD and turn detector once per worker process, shared by every job."""
+    started = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["turn_detection"] = MultilingualModel()
+    print(f"Prewarmed worker process in {(time.perf_counter() - started) * 1000:.1f} ms")
+
 
+async def entrypoint(ctx: agents.JobContext):
+    job_started = time.perf_counter()
+    hold_session()
+    ctx.add_shutdown_callback(release_session)
+    hold_knowledge_backend()
+    ctx.add_shutdown_callback(release_knowledge_backend)
+
+    userdata = ctx.proc.userdata
+    # A job is cold only if it had to load the models itself; after prewarm
+    # every job, the first included, reuses them. The model load cost is
+    # reported separately by prewarm().
+    start_kind = "warm"
+    if "vad" not in userdata:
+        prewarm(ctx.proc)
+        start_kind = "cold"
+
+    session_data = SessionData(tenant=get_tenant(ctx))
+    # Provider clients are module level so their connection pools outlive the job.
     session = AgentSession(
-        stt=deepgram.STT(model="nova-3", language="multi"),
-        llm=openai.LLM(model="gpt-4o"),
-        tts=cartesia.TTS(),
-        vad=silero.VAD.load(),
-        turn_detection=MultilingualModel(),
+        userdata=session_data,
+        stt=stt,
+        llm=llm,
+        tts=tts,
+        vad=userdata["vad"],
+        turn_detection=userdata["turn_detection"],
     )
 
+    if SPECULATIVE_PREFETCH:
+        # Look the caller's words up while they are still speaking, so the
+        # answer is usually cached by the time the LLM calls the tool.
+        @session.on("user_input_transcribed")
+        def prefetch_knowledge(event):
+            session_data.retrieval_cache.prefetch(event.transcript, session_data.search)
+
     await session.start(
         room=ctx.room,
         agent=agent,
@@ -89,10 +159,17 @@ async def entrypoint(ctx: agents.JobContext):
         ),
     )
 
+    print(
+        f"Job start latency ({start_kind}): "
+        f"{(time.perf_counter() - job_started) * 1000:.1f} ms"
+    )
+
     await session.generate_reply(
         instructions="Greet the user and offer your assistance."
     )
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    agents.cli.run_app(
+        agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm)
+    )
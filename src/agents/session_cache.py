@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, FrozenSet, Optional, Tuple
+
+from src.knowledge_base.normalize import is_near_duplicate, normalize_question
+
+SESSION_CACHE_SIZE = int(os.environ.get("KB_SESSION_CACHE_SIZE", "64"))
+SESSION_CACHE_TTL = float(os.environ.get("KB_SESSION_CACHE_TTL", "60"))
+SPECULATIVE_PREFETCH = os.environ.get("KB_SPECULATIVE_PREFETCH", "0") == "1"
+# Interim transcripts shorter than this are too vague to be worth a lookup.
+PREFETCH_MIN_WORDS = 3
+
+
+def normalize_query(query: str) -> Tuple[str, FrozenSet[str]]:
+    """
+    Cache key and token set of a query, normalized like knowledge base
+    questions: case, punctuation and word order do not matter.
+    """
+    tokens, digest = normalize_question(query)
+    return digest, frozenset(tokens)
+
+
+class RetrievalCache:
+    """
+    Per-session LRU cache of knowledge base lookups keyed on the normalized
+    question hash. A query without an exact key reuses a cached lookup that
+    differs from it only by a stopword, the rule pending-query dedup uses, so
+    a changed content word ("open" vs "close") is always a miss. Entries hold
+    the lookup task itself, so a tool call that arrives while the same lookup
+    is still in flight (e.g. a speculative prefetch) awaits it instead of
+    issuing a second request.
+    """
+
+    def __init__(
+        self,
+        max_size: int = SESSION_CACHE_SIZE,
+        ttl: float = SESSION_CACHE_TTL,
+        is_cacheable: Callable[[Any], bool] = lambda result: True,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Results failing this check (e.g. error payloads) are refetched next time.
+        self.is_cacheable = is_cacheable
+        self._entries: "OrderedDict[str, Tuple[float, asyncio.Task, FrozenSet[str]]]" = OrderedDict()
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(self, query: str, fetch: Callable[[str], Awaitable[Any]]) -> Any:
+        """Return the cached result for `query`, calling `fetch` on a miss."""
+        task = self._lookup(*normalize_query(query))
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = self._start(query, fetch)
+        return await asyncio.shield(task)
+
+    def prefetch(self, query: str, fetch: Callable[[str], Awaitable[Any]]):
+        """Start a lookup for `query` in the background if it is not cached yet."""
+        if len(query.split()) < PREFETCH_MIN_WORDS:
+            return
+        # Interim transcripts arrive faster than lookups finish; keep at most
+        # one speculative lookup in flight per session.
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            return
+        if self._lookup(*normalize_query(query)) is None:
+            self._prefetch_task = self._start(query, fetch)
+
+    def clear(self):
+        for _, task, _ in self._entries.values():
+            if not task.done():
+                task.cancel()
+        self._entries.clear()
+
+    def _lookup(self, key: str, tokens: FrozenSet[str]) -> Optional[asyncio.Task]:
+        if key not in self._entries:
+            key = self._near_duplicate_key(tokens)
+            if key is None:
+                return None
+        created_at, task, _ = self._entries[key]
+        if time.monotonic() - created_at > self.ttl or (
+            task.done()
+            and (
+                task.cancelled()
+                or task.exception() is not None
+                or not self.is_cacheable(task.result())
+            )
+        ):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return task
+
+    def _near_duplicate_key(self, tokens: FrozenSet[str]) -> Optional[str]:
+        """Key of a cached lookup differing from `tokens` only by a stopword."""
+        for key, (_, _, cached) in reversed(self._entries.items()):
+            if is_near_duplicate(tokens, cached):
+                return key
+        return None
+
+    def _start(self, query: str, fetch: Callable[[str], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.ensure_future(fetch(query))
+        key, tokens = normalize_query(query)
+        self._entries[key] = (time.monotonic(), task, tokens)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return task
@@ -1,6 +1,45 @@
-from django.apps import AppConfig
+import logging
+import threading
+
+from django.apps import AppConfig, apps
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger("app_logger")
 
 
 class SrcConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src'
+
+    def ready(self):
+        # Keeps the knowledge base index and caches in sync with model writes
+        import src.signals  # noqa: F401
+
+
+def start_knowledge_base_warm_up():
+    """
+    Build the shared knowledge base index in the background. Called by the
+    ASGI/WSGI entry points only, so management commands, shells and Celery
+    workers (which warm up in worker_process_init) do not load it.
+    """
+    if not getattr(settings, "KNOWLEDGE_BASE_WARM_UP", True):
+        return
+    threading.Thread(
+        target=_warm_up_knowledge_base,
+        name="knowledge-base-warm-up",
+        daemon=True,
+    ).start()
+
+
+def _warm_up_knowledge_base():
+    from src.knowledge_base.knowledge import get_knowledge_base
+
+    # Queries are only allowed once every app has finished loading.
+    apps.ready_event.wait()
+    try:
+        get_knowledge_base().warm_up()
+    except DatabaseError:
+        logger.warning("Skipping knowledge base warm-up, database not ready")
+    finally:
+        connection.close()
@@ -0,0 +1,159 @@
+import json
+import traceback
+from typing import Any, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from src.knowledge_base.knowledge import get_knowledge_base, get_loaded_knowledge_base, is_known_tenant
+from src.models import User
+from src.query_dedup import create_or_attach_query, notify_query_answered
+from src.views import (
+    get_answer_target,
+    get_request_tenant,
+    parse_knowledge_request,
+    parse_query_expiry,
+    query_request_response,
+    render_search_response,
+)
+import logging
+
+logger = logging.getLogger("app_logger")
+
+# Async counterparts of the hot agent endpoints in src/views.py. Served under
+# ASGI they never park a worker thread on the ORM.
+
+
+def _parse_json_body(request) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@require_GET
+async def search_query(request):
+    """Search for similar entries in the knowledge base."""
+    query = request.GET.get("query", "")
+
+    if not query:
+        return JsonResponse(
+            {"error": "Query parameter is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    tenant = get_request_tenant(request)
+    knowledge_base = get_loaded_knowledge_base(tenant)
+    if knowledge_base is None:
+        if not await sync_to_async(is_known_tenant)(tenant):
+            return JsonResponse({"error": "Unknown tenant."}, status=status.HTTP_404_NOT_FOUND)
+        knowledge_base = get_knowledge_base(tenant)
+    if knowledge_base.is_warm:
+        # Everything is in memory, so there is no blocking work to offload.
+        similar_entries = knowledge_base._find_similar_entries(query)
+        body = render_search_response(similar_entries, knowledge_base)
+    else:
+        similar_entries = await sync_to_async(knowledge_base._find_similar_entries)(query)
+        body = await sync_to_async(render_search_response)(similar_entries, knowledge_base)
+
+    return HttpResponse(body, content_type="application/json", status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+async def create_query(request):
+    """Create a new query request."""
+    try:
+        data = _parse_json_body(request)
+        if data is None:
+            return JsonResponse(
+                {"error": "Request body must be a JSON object."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        user_id = data.get("user_id")
+        question = data.get("question")
+
+        if not user_id or not question:
+            return JsonResponse(
+                {"error": "User ID and question are required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        expiry, error = parse_query_expiry(data)
+        if error:
+            return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        tenant = get_request_tenant(request, data)
+        if not await sync_to_async(is_known_tenant)(tenant):
+            return JsonResponse({"error": "Unknown tenant."}, status=status.HTTP_404_NOT_FOUND)
+        user = await User.objects.filter(id=user_id).afirst()
+        # The duplicate lookup and insert share a transaction, so they run in a thread.
+        query_request, created = await sync_to_async(create_or_attach_query)(
+            user,
+            question,
+            tenant,
+            expiry,
+            dedupe=data.get("dedupe", True) is not False,
+        )
+        return JsonResponse(
+            query_request_response(query_request, created),
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+    except Exception as e:
+        logger.error(f"Error in async create_query :{traceback.format_exc()}")
+        return JsonResponse(
+            {"error": f"An error occurred: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+@transaction.atomic
+def _store_knowledge(params: Dict[str, Any], tenant: str) -> Tuple[bool, Any]:
+    """Write the knowledge entry and queue the requester's notification, in one transaction."""
+    knowledge_base, query_request = get_answer_target(params, tenant)
+    success, result = knowledge_base.add_or_update_knowledge(**params)
+    if success and query_request is not None:
+        logger.info(f"query_request_id {params['query_request_id']}")
+        notify_query_answered(query_request, params["answer"], params["question"])
+    return success, result
+
+
+@csrf_exempt
+@require_POST
+async def add_knowledge(request):
+    """Add or update knowledge in the knowledge base."""
+    try:
+        data = _parse_json_body(request)
+        if data is None:
+            return JsonResponse(
+                {"error": "Request body must be a JSON object."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        params, error = parse_knowledge_request(data)
+        if error:
+            return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        tenant = get_request_tenant(request, data)
+        # An answer to a query goes to the query's tenant, whatever the request names.
+        if not params["query_request_id"] and not await sync_to_async(is_known_tenant)(tenant):
+            return JsonResponse({"error": "Unknown tenant."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Transactions are not available on the async ORM, so the write runs
+        # in a thread; the webhook is dispatched in the background after commit.
+        success, result = await sync_to_async(_store_knowledge)(params, tenant)
+        if not success:
+            return JsonResponse({"error": result}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse(
+            {"message": "Knowledge added/updated successfully", "id": result},
+            status=status.HTTP_201_CREATED,
+        )
+    except Exception as e:
+        logger.error(f"Exception occured while adding knowledge {traceback.format_exc()}")
+        return JsonResponse(
+            {"error": f"An error occurred: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
@@ -0,0 +1,154 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from src.model_helpers import ChangeEventActionOptions
+from src.models import ChangeEvent, KnowledgeBase, QueryRequest
+import json
+import logging
+
+logger = logging.getLogger("app_logger")
+
+DASHBOARD_GROUP = "dashboard"
+MAX_EVENTS_PER_PAGE = 500
+
+# Feed name and the fields carried in each event, per tracked model.
+TRACKED_MODELS = {
+    QueryRequest: (
+        "query_request",
+        [
+            "id",
+            "user_id",
+            "tenant",
+            "question",
+            "status",
+            "follower_count",
+            "created_at",
+            "updated_at",
+            "expires_at",
+        ],
+    ),
+    KnowledgeBase: (
+        "knowledge_base",
+        ["id", "tenant", "question", "answer", "type", "source", "query_request_id", "updated_at"],
+    ),
+}
+
+
+def snapshot(instance) -> Dict[str, Any]:
+    """The tracked fields of a model instance, as stored in its change event."""
+    _, fields = TRACKED_MODELS[type(instance)]
+    return {field: getattr(instance, field) for field in fields}
+
+
+def serialize_event(event: ChangeEvent) -> Dict[str, Any]:
+    return {
+        "seq": event.id,
+        "model": event.model,
+        "object_id": event.object_id,
+        "action": event.action,
+        "data": event.data,
+        "created_at": event.created_at,
+    }
+
+
+def record_change(instance, action: ChangeEventActionOptions):
+    """Append a change event for one instance and publish it after commit."""
+    model_name, _ = TRACKED_MODELS[type(instance)]
+    data = snapshot(instance) if action != ChangeEventActionOptions.DELETED else None
+    event = ChangeEvent.objects.create(
+        model=model_name, object_id=instance.id, action=action, data=data
+    )
+    publish_after_commit([event])
+
+
+def record_bulk_changes(model, rows: Iterable[Dict[str, Any]], action: ChangeEventActionOptions):
+    """Append change events for rows written by a bulk query, which sends no signals."""
+    model_name, _ = TRACKED_MODELS[model]
+    events = ChangeEvent.objects.bulk_create(
+        [
+            ChangeEvent(model=model_name, object_id=row["id"], action=action, data=row)
+            for row in rows
+        ]
+    )
+    if events:
+        publish_after_commit(events)
+    return events
+
+
+def events_since(
+    since: int, limit: int = MAX_EVENTS_PER_PAGE, lookback: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` events with a sequence number greater than `since`, oldest
+    first, preceded by the events at or below `since` created within
+    `lookback` seconds (CHANGE_FEED_LOOKBACK) of it. Sequence numbers are
+    taken when a row is inserted, not when its transaction commits, so an
+    event numbered below one a client has already seen can still appear.
+    Clients skip the sequence numbers they have already applied.
+    """
+    if lookback is None:
+        lookback = getattr(settings, "CHANGE_FEED_LOOKBACK", 60)
+    events = list(ChangeEvent.objects.filter(id__gt=since).order_by("id")[:limit])
+    anchor = None
+    if since > 0 and lookback:
+        anchor = (
+            ChangeEvent.objects.filter(id__lte=since)
+            .order_by("-id")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+    if anchor is not None:
+        recent = ChangeEvent.objects.filter(
+            id__lte=since, created_at__gte=anchor - timedelta(seconds=lookback)
+        ).order_by("-id")[:limit]
+        events = list(reversed(recent)) + events
+    return [serialize_event(event) for event in events]
+
+
+def prune_events(before, batch_size: int = 1000) -> int:
+    """
+    Delete events created before `before`, oldest first, in batches of
+    `batch_size`. Sequence numbers grow with created_at, so the cut-off is
+    found by walking the primary key from the start. Returns the count deleted.
+    """
+    events = ChangeEvent.objects.order_by("id").values_list("id", flat=True)
+    first_kept = events.filter(created_at__gte=before).first()
+    if first_kept is None:
+        # Everything is stale; bound the range so events written meanwhile survive.
+        last = events.last()
+        if last is None:
+            return 0
+        first_kept = last + 1
+    stale = events.filter(id__lt=first_kept)
+    deleted = 0
+    while True:
+        ids = list(stale[:batch_size])
+        if not ids:
+            return deleted
+        deleted += ChangeEvent.objects.filter(id__gte=ids[0], id__lte=ids[-1]).delete()[0]
+
+
+def publish_after_commit(events: List[ChangeEvent]):
+    """Push events to connected dashboards once they are visible to readers."""
+    transaction.on_commit(lambda: _publish(events))
+
+
+def _publish(events: List[ChangeEvent]):
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not events:
+        return
+    # Round-trip through JSON so datetimes survive the channel layer.
+    payload = json.loads(
+        json.dumps([serialize_event(event) for event in events], cls=DjangoJSONEncoder)
+    )
+    try:
+        async_to_sync(channel_layer.group_send)(
+            DASHBOARD_GROUP, {"type": "change.events", "events": payload}
+        )
+    except Exception as e:
+        logger.error(f"Error publishing change events: {e}")
@@ -0,0 +1,39 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.core.serializers.json import DjangoJSONEncoder
+from src.changefeed import DASHBOARD_GROUP, events_since
+import json
+
+
+class DashboardConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes QueryRequest and KnowledgeBase change events to supervisor
+    dashboards. Connect with ?since=<seq> to first replay what was missed.
+    """
+
+    async def connect(self):
+        await self.channel_layer.group_add(DASHBOARD_GROUP, self.channel_name)
+        await self.accept()
+
+        query = dict(
+            pair.split("=", 1)
+            for pair in self.scope.get("query_string", b"").decode().split("&")
+            if "=" in pair
+        )
+        try:
+            since = int(query.get("since", ""))
+        except ValueError:
+            return
+        backlog = await database_sync_to_async(events_since)(since)
+        if backlog:
+            await self.send_json({"events": backlog})
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(DASHBOARD_GROUP, self.channel_name)
+
+    async def change_events(self, message):
+        await self.send_json({"events": message["events"]})
+
+    @classmethod
+    async def encode_json(cls, content):
+        return json.dumps(content, cls=DjangoJSONEncoder)
@@ -6,6 +6,8 @@ document.addEventListener("DOMContentLoaded", function () {
 
    setupTabs();
 
+   subscribeToChanges();
+
    document
      .getElementById("close-modal")
      .addEventListener("click", closeModal);
@@ -23,6 +25,234 @@ document.addEventListener("DOMContentLoaded", function () {
      });
  });
 
+ // Rendered query cards by status and id, so change events can update the
+ // lists in place. Events arriving while a list is being fetched are held
+ // in `buffered` and applied once it has been rendered.
+ const QUERY_PAGE_SIZE = 50;
+ const queryLists = {
+   pending: {
+     container: "pending-queries",
+     endpoint: "http://127.0.0.1:8000/api/query-request/pending-query/",
+     cards: new Map(),
+     loaded: false,
+     buffered: null,
+     nextCursor: null,
+   },
+   unresolved: {
+     container: "unresolved-queries",
+     endpoint: "http://127.0.0.1:8000/api/query-request/get-unresolved-queries/",
+     cards: new Map(),
+     loaded: false,
+     buffered: null,
+     nextCursor: null,
+   },
+ };
+ let lastSeq = null;
+ // Sequence numbers already applied. A reconnect resends recent events at or
+ // below lastSeq, since one may have committed after a higher one was seen;
+ // only the ones not applied yet are used.
+ const MAX_APPLIED_SEQS = 5000;
+ const appliedSeqs = new Set();
+
+ function subscribeToChanges() {
+   // Apply change feed events to the rendered lists instead of re-fetching
+   // them; on reconnect, replay what was missed from the last sequence seen.
+   const since = lastSeq === null ? "" : `?since=${lastSeq}`;
+   const socket = new WebSocket(`ws://127.0.0.1:8000/ws/dashboard/${since}`);
+   socket.onmessage = function (event) {
+     const { events } = JSON.parse(event.data);
+     events.forEach(applyChange);
+   };
+   socket.onclose = function () {
+     setTimeout(subscribeToChanges, 5000);
+   };
+ }
+
+ function applyChange(change) {
+   if (appliedSeqs.has(change.seq)) {
+     return;
+   }
+   appliedSeqs.add(change.seq);
+   if (appliedSeqs.size > MAX_APPLIED_SEQS) {
+     // Sets iterate in insertion order, so this forgets the oldest.
+     appliedSeqs.delete(appliedSeqs.values().next().value);
+   }
+   lastSeq = Math.max(lastSeq || 0, change.seq);
+   if (change.model !== "query_request") {
+     return;
+   }
+   Object.entries(queryLists).forEach(([status, list]) => {
+     if (list.buffered !== null) {
+       list.buffered.push(change);
+     } else if (list.loaded) {
+       applyListChange(status, change);
+     }
+   });
+ }
+
+ function applyListChange(status, change) {
+   const query = change.data;
+   if (query && query.status === status) {
+     upsertCard(status, query);
+   } else {
+     removeCard(status, change.object_id);
+   }
+ }
+
+ function startListFetch(status) {
+   queryLists[status].buffered = [];
+ }
+
+ function finishListFetch(status) {
+   const list = queryLists[status];
+   const buffered = list.buffered || [];
+   list.buffered = null;
+   list.loaded = true;
+   buffered.forEach(change => applyListChange(status, change));
+ }
+
+ function upsertCard(status, query) {
+   const list = queryLists[status];
+   const card = createQueryCard(status, query);
+   const existing = list.cards.get(query.id);
+   if (existing) {
+     existing.replaceWith(card);
+   } else {
+     const container = document.getElementById(list.container);
+     if (list.cards.size === 0) {
+       container.innerHTML = "";
+       showLoadMore(status);
+     }
+     container.prepend(card);
+   }
+   list.cards.set(query.id, card);
+ }
+
+ function removeCard(status, queryId) {
+   const list = queryLists[status];
+   const card = list.cards.get(queryId);
+   if (!card) {
+     return;
+   }
+   card.remove();
+   list.cards.delete(queryId);
+   if (list.cards.size === 0) {
+     showEmptyList(status);
+     showLoadMore(status);
+   }
+ }
+
+ async function fetchQueryPage(status, cursor) {
+   // Newest-first keyset pages; the server caps the page size either way.
+   const params = new URLSearchParams({ fields: "id,question,created_at", limit: QUERY_PAGE_SIZE });
+   if (cursor) {
+     params.set("cursor", cursor);
+   }
+   const response = await fetch(`${queryLists[status].endpoint}?${params}`);
+   if (!response.ok) {
+     throw new Error(`Failed to fetch ${status} queries`);
+   }
+   const page = await response.json();
+   queryLists[status].nextCursor = page.next_cursor;
+   return page.results;
+ }
+
+ function showLoadMore(status) {
+   const list = queryLists[status];
+   const container = document.getElementById(list.container);
+   const existing = container.querySelector(".load-more");
+   if (existing) {
+     existing.remove();
+   }
+   if (!list.nextCursor) {
+     return;
+   }
+   const button = document.createElement("button");
+   button.className = "load-more";
+   button.style.gridColumn = "1 / -1";
+   button.textContent = "Load more";
+   button.addEventListener("click", () => loadMoreQueries(status, button));
+   container.appendChild(button);
+ }
+
+ async function loadMoreQueries(status, button) {
+   const list = queryLists[status];
+   button.disabled = true;
+   startListFetch(status);
+   try {
+     const queries = await fetchQueryPage(status, list.nextCursor);
+     const container = document.getElementById(list.container);
+     queries.forEach((query) => {
+       // A change event may already have rendered this query.
+       if (list.cards.has(query.id)) {
+         return;
+       }
+       const card = createQueryCard(status, query);
+       list.cards.set(query.id, card);
+       container.insertBefore(card, button);
+     });
+     showLoadMore(status);
+   } catch (error) {
+     console.error("Error:", error);
+     button.disabled = false;
+   }
+   finishListFetch(status);
+ }
+
+ function showEmptyList(status) {
+   const container = document.getElementById(queryLists[status].container);
+   if (status === "pending") {
+     container.innerHTML = `
+               <div style="text-align: center; grid-column: 1 / -1; padding: 30px;">
+                   <h3>No pending queries</h3>
+                   <p>All customer queries have been addressed.</p>
+               </div>
+           `;
+   } else {
+     container.innerHTML = `
+       <div style="text-align: center; grid-column: 1 / -1; padding: 30px;">
+         <h3>No unresolved queries</h3>
+         <p>There are no unresolved customer queries.</p>
+       </div>
+     `;
+   }
+ }
+
+ function createQueryCard(status, query) {
+   const date = new Date(query.created_at);
+   const formattedDate = date.toLocaleString();
+
+   const card = document.createElement("div");
+   card.className = "card";
+   if (status === "pending") {
+     card.innerHTML = `
+               <div class="status-badge"><span class="math-inline">PENDING</div\>
+               <h3\>Query \#</span>${query.id}</h3>
+               <p>${
+                 query.question.length > 150
+                   ? query.question.substring(0,150) + "...": query.question
+               }</p>
+               <div class="date">Received: ${formattedDate}</div>
+           `;
+   } else {
+     card.innerHTML = `
+       <div class="unresolved-badge">UNRESOLVED</div>
+       <h3>Query #${query.id}</h3>
+       <p>${
+         query.question.length > 150
+           ? query.question.substring(0, 150) + "..."
+           : query.question
+       }</p>
+       <div class="date">Received: ${formattedDate}</div>
+     `;
+   }
+
+   card.addEventListener("click", function () {
+     openModal(query);
+   });
+   return card;
+ }
+
  function setupTabs() {
    const tabs = document.querySelectorAll('.tab');
    tabs.forEach(tab => {
@@ -49,19 +279,14 @@ document.addEventListener("DOMContentLoaded", function () {
  }
 
  async function fetchPendingQueries() {
+   startListFetch("pending");
    try {
-     const response = await fetch(
-       "http://127.0.0.1:8000/api/query-request/pending-query"
-     );
-
-     if (!response.ok) {
-       throw new Error("Failed to fetch queries");
-     }
-
-     const queries = await response.json();
+     const queries = await fetchQueryPage("pending");
      document.getElementById("initial-loader").style.display = "none";
      displayQueries(queries);
+     finishListFetch("pending");
    } catch (error) {
+     queryLists.pending.buffered = null;
      console.error("Error:", error);
      document.getElementById("initial-loader").style.display = "none";
      document.getElementById("pending-queries").innerHTML = `
@@ -74,19 +299,14 @@ document.addEventListener("DOMContentLoaded", function () {
  }
 
  async function fetchUnresolvedQueries() {
+   startListFetch("unresolved");
    try {
-     const response = await fetch(
-       "http://127.0.0.1:8000/api/query-request/get-unresolved-queries"
-     );
-
-     if (!response.ok) {
-       throw new Error("Failed to fetch unresolved queries");
-     }
-
-     const unresolvedQueries = await response.json();
+     const unresolvedQueries = await fetchQueryPage("unresolved");
      document.getElementById("unresolved-loader").style.display = "none";
      displayUnresolvedQueries(unresolvedQueries);
+     finishListFetch("unresolved");
    } catch (error) {
+     queryLists.unresolved.buffered = null;
      console.error("Error:", error);
      document.getElementById("unresolved-loader").style.display = "none";
      document.getElementById("unresolved-queries").innerHTML = `
@@ -124,82 +344,31 @@ document.addEventListener("DOMContentLoaded", function () {
  }
 
  function displayQueries(queries) {
-   const container = document.getElementById("pending-queries");
-
-   if (queries.length === 0) {
-     container.innerHTML = `
-               <div style="text-align: center; grid-column: 1 / -1; padding: 30px;">
-                   <h3>No pending queries</h3>
-                   <p>All customer queries have been addressed.</p>
-               </div>
-           `;
-     return;
-   }
-
-   container.innerHTML = "";
-
-   queries.forEach((query) => {
-     const date = new Date(query.created_at);
-     const formattedDate = date.toLocaleString();
-
-     const card = document.createElement("div");
-     card.className = "card";
-     card.innerHTML = `
-               <div class="status-badge"><span class="math-inline">PENDING</div\>
-               <h3\>Query \#</span>${query.id}</h3>
-               <p>${
-                 query.question.length > 150
-                   ? query.question.substring(0,150) + "...": query.question
-               }</p>
-               <div class="date">Received: ${formattedDate}</div>
-           `;
-
-     card.addEventListener("click", function () {
-       openModal(query);
-     });
-
-     container.appendChild(card);
-   });
+   displayQueryList("pending", queries);
  }
 
  function displayUnresolvedQueries(queries) {
-   const container = document.getElementById("unresolved-queries");
+   displayQueryList("unresolved", queries);
+ }
+
+ function displayQueryList(status, queries) {
+   const list = queryLists[status];
+   list.cards.clear();
 
    if (queries.length === 0) {
-     container.innerHTML = `
-       <div style="text-align: center; grid-column: 1 / -1; padding: 30px;">
-         <h3>No unresolved queries</h3>
-         <p>There are no unresolved customer queries.</p>
-       </div>
-     `;
+     showEmptyList(status);
      return;
    }
 
+   const container = document.getElementById(list.container);
    container.innerHTML = "";
 
    queries.forEach((query) => {
-     const date = new Date(query.created_at);
-     const formattedDate = date.toLocaleString();
-
-     const card = document.createElement("div");
-     card.className = "card";
-     card.innerHTML = `
-       <div class="unresolved-badge">UNRESOLVED</div>
-       <h3>Query #${query.id}</h3>
-       <p>${
-         query.question.length > 150
-           ? query.question.substring(0, 150) + "..."
-           : query.question
-       }</p>
-       <div class="date">Received: ${formattedDate}</div>
-     `;
-
-     card.addEventListener("click", function () {
-       openModal(query);
-     });
-
+     const card = createQueryCard(status, query);
+     list.cards.set(query.id, card);
      container.appendChild(card);
    });
+   showLoadMore(status);
  }
 
  function displayResolvedQueries(queries) {
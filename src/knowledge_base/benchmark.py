@@ -0,0 +1,104 @@
+# knowledge_base/benchmark.py
+import random
+import statistics
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Seed words for synthetic salon questions; the rest of the vocabulary is
+# made-up words so that large vocabularies stay reproducible.
+SALON_WORDS = [
+    "haircut", "color", "balayage", "highlights", "blowout", "keratin", "perm",
+    "manicure", "pedicure", "gel", "acrylic", "nails", "facial", "waxing",
+    "eyebrow", "lash", "extensions", "massage", "bridal", "makeup", "trim",
+    "fade", "beard", "shave", "scalp", "treatment", "toner", "bleach",
+    "appointment", "booking", "cancel", "deposit", "price", "cost", "discount",
+    "gift", "card", "parking", "weekend", "sunday", "evening", "stylist",
+    "senior", "junior", "kids", "student", "membership", "refund", "walk",
+]
+QUESTION_STARTS = [
+    "do you offer", "how much is", "can i book", "what does", "is there",
+    "how long does", "do you have", "can you do", "when is", "who does",
+]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vi", "su", "dor", "el", "pa", "qu", "zen"]
+
+
+def build_vocabulary(size: int, rng: random.Random) -> List[str]:
+    """`size` distinct words: the salon words first, then generated ones."""
+    words = list(SALON_WORDS[:size])
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def _pick_words(vocabulary: Sequence[str], count: int, rng: random.Random) -> List[str]:
+    # Skewed towards the start of the vocabulary, like real question wording.
+    return [vocabulary[min(int(rng.paretovariate(1.2)) - 1, len(vocabulary) - 1)] for _ in range(count)]
+
+
+def generate_entries(
+    count: int, vocabulary: Sequence[str], rng: random.Random
+) -> List[Tuple[str, str]]:
+    """`count` distinct (question, answer) pairs."""
+    entries = []
+    seen = set()
+    while len(entries) < count:
+        words = _pick_words(vocabulary, rng.randint(2, 6), rng) + rng.sample(vocabulary, 2)
+        question = f"{rng.choice(QUESTION_STARTS)} {' '.join(words)}?"
+        if question in seen:
+            continue
+        seen.add(question)
+        entries.append((question, f"Answer {len(entries)}: {' '.join(words)}."))
+    return entries
+
+
+def generate_queries(
+    count: int, questions: Sequence[str], vocabulary: Sequence[str], rng: random.Random
+) -> List[str]:
+    """
+    Caller questions against a knowledge base of `questions`: a third repeat an
+    entry, a third reword one and a third are unrelated.
+    """
+    queries = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            queries.append(rng.choice(questions).upper())
+        elif kind == 1:
+            words = rng.choice(questions).rstrip("?").split()
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            queries.append(" ".join(words) + " please")
+        else:
+            queries.append(f"{rng.choice(QUESTION_STARTS)} {' '.join(_pick_words(vocabulary, 4, rng))}")
+    return queries
+
+
+def generate_info_sections(count: int, rng: random.Random) -> Dict[str, Any]:
+    """INFO descriptions keyed by section, shaped like the salon information."""
+    return {
+        f"section_{i}": {f"field_{j}": f"value {rng.randint(0, 10**6)}" for j in range(20)}
+        for i in range(count)
+    }
+
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """Percentiles and throughput of per-operation durations given in seconds."""
+    if not samples:
+        return {"count": 0}
+    total = sum(samples)
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = samples[0]
+    return {
+        "count": len(samples),
+        "mean_ms": round(1000 * total / len(samples), 4),
+        "p50_ms": round(1000 * p50, 4),
+        "p95_ms": round(1000 * p95, 4),
+        "p99_ms": round(1000 * p99, 4),
+        "max_ms": round(1000 * max(samples), 4),
+        "per_second": round(len(samples) / total, 1) if total else None,
+    }
@@ -0,0 +1,281 @@
+# knowledge_base/bulk_import.py
+import csv
+import json
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+from src.changefeed import record_bulk_changes, snapshot
+from src.knowledge_base.embeddings import embeddings_enabled
+from src.model_helpers import ChangeEventActionOptions, KnowledgeBaseTypeOptions, SourceOptions
+from src.models import DEFAULT_TENANT, KnowledgeBase as KnowledgeBaseModel
+import logging
+
+logger = logging.getLogger("app_logger")
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# Columns of a CSV import; `description` holds a JSON object.
+CSV_FIELDS = ["type", "question", "answer", "source", "description_key", "description"]
+
+
+class ImportReport:
+    """Counts and errors of one bulk import."""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated + self.error_count
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "errors": self.error_count,
+            "error_details": self.errors,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "entries_per_second": round(self.rate, 1),
+        }
+
+
+def iter_records(stream: IO[str], file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Stream (line number, record) pairs from a JSONL or CSV file without loading
+    it whole. Records that cannot be parsed are yielded as an error string.
+    """
+    if file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+    elif file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            line_number = reader.line_num
+            description = row.get("description")
+            if description:
+                try:
+                    row["description"] = json.loads(description)
+                except ValueError as e:
+                    yield line_number, f"Invalid description JSON: {e}"
+                    continue
+            yield line_number, {key: value for key, value in row.items() if value not in (None, "")}
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def validate_record(record: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Normalize one import record, applying the same rules as add-knowledge.
+    Returns the cleaned record or an error message.
+    """
+    if not isinstance(record, dict):
+        return None, "Record must be a JSON object."
+
+    knowledge_type = record.get("type", KnowledgeBaseTypeOptions.QUERY)
+    source = record.get("source", SourceOptions.INITIAL)
+    try:
+        knowledge_type = KnowledgeBaseTypeOptions(str(knowledge_type).lower())
+    except ValueError:
+        return None, f"Invalid knowledge type: {knowledge_type}"
+    try:
+        source = SourceOptions(str(source).lower())
+    except ValueError:
+        return None, f"Invalid source: {source}"
+
+    if knowledge_type == KnowledgeBaseTypeOptions.INFO:
+        description = record.get("description")
+        description_key = record.get("description_key")
+        if not description or not isinstance(description, dict):
+            return None, "Description is required for INFO type."
+        if not description_key or description_key not in description:
+            return None, "Description key is required for INFO type."
+        return {
+            "type": knowledge_type,
+            "source": source,
+            "description_key": description_key,
+            "value": description[description_key],
+        }, None
+
+    question = record.get("question")
+    answer = record.get("answer")
+    if not question or not isinstance(question, str):
+        return None, "Question is required for QUERY type."
+    if not answer or not isinstance(answer, str):
+        return None, "Answer is required for QUERY type."
+    return {
+        "type": knowledge_type,
+        "source": source,
+        "question": question,
+        "answer": answer,
+        "description": record.get("description") or {},
+    }, None
+
+
+def import_knowledge(
+    records: Iterable[Tuple[int, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    reload: bool = True,
+    tenant: str = DEFAULT_TENANT,
+) -> ImportReport:
+    """
+    Validate and upsert (line number, record) pairs into a tenant's knowledge
+    base in batches of `batch_size`, one short transaction per batch. QUERY entries are matched on their
+    question and INFO entries on their description key, as in
+    add_or_update_knowledge. Every written row gets a new updated_at, so
+    each process holding the tenant's index rebuilds it on its next freshness
+    check; a copy loaded in this process is reloaded right away.
+    """
+    report = ImportReport()
+    batch: List[Dict[str, Any]] = []
+
+    for line_number, record in records:
+        if isinstance(record, str):
+            report.add_error(line_number, record)
+            continue
+        cleaned, error = validate_record(record)
+        if error:
+            report.add_error(line_number, error)
+            continue
+        batch.append(cleaned)
+        if len(batch) >= batch_size:
+            _upsert_batch(batch, tenant, report)
+            batch = []
+    if batch:
+        _upsert_batch(batch, tenant, report)
+
+    if reload and (report.created or report.updated):
+        # Bulk writes send no signals; skip the wait for the freshness check here.
+        from src.knowledge_base.knowledge import get_loaded_knowledge_base
+
+        knowledge_base = get_loaded_knowledge_base(tenant)
+        if knowledge_base is not None:
+            knowledge_base.reload()
+
+    report.elapsed = time.monotonic() - report.started
+    logger.info(
+        f"Imported knowledge: {report.created} created, {report.updated} updated, "
+        f"{report.error_count} errors in {report.elapsed:.2f}s ({report.rate:.0f} entries/s)"
+    )
+    return report
+
+
+@transaction.atomic
+def _upsert_batch(batch: List[Dict[str, Any]], tenant: str, report: ImportReport):
+    now = timezone.now()
+    to_create: List[KnowledgeBaseModel] = []
+    to_update: Dict[int, KnowledgeBaseModel] = {}
+
+    queries = {}
+    infos = {}
+    for record in batch:
+        # Later records in a batch win, as they would with one-by-one writes.
+        if record["type"] == KnowledgeBaseTypeOptions.INFO:
+            infos[record["description_key"]] = record
+        else:
+            queries[record["question"]] = record
+
+    if queries:
+        existing = {}
+        for entry in KnowledgeBaseModel.objects.filter(
+            tenant=tenant, type=KnowledgeBaseTypeOptions.QUERY, question__in=list(queries)
+        ).order_by("-id"):
+            # The oldest entry wins, matching add_or_update_knowledge's .first().
+            existing[entry.question] = entry
+        for question, record in queries.items():
+            entry = existing.get(question)
+            if entry is None:
+                entry = KnowledgeBaseModel(
+                    tenant=tenant,
+                    type=record["type"],
+                    question=question,
+                    answer=record["answer"],
+                    source=record["source"],
+                    description=record["description"],
+                )
+                # bulk_create skips save(), so derive the question columns here.
+                entry.prepare_question()
+                to_create.append(entry)
+            else:
+                entry.answer = record["answer"]
+                entry.source = record["source"]
+                if not entry.question_hash or (entry.embedding is None and embeddings_enabled()):
+                    entry.prepare_question()
+                entry.updated_at = now
+                to_update[entry.id] = entry
+
+    if infos:
+        # INFO sections are few; match them on the keys of their description.
+        existing = {}
+        for entry in KnowledgeBaseModel.objects.filter(
+            tenant=tenant, type=KnowledgeBaseTypeOptions.INFO
+        ).order_by("-id"):
+            for key in entry.description or {}:
+                existing[key] = entry
+        for key, record in infos.items():
+            entry = existing.get(key)
+            if entry is None:
+                entry = KnowledgeBaseModel(
+                    tenant=tenant,
+                    type=record["type"],
+                    answer="",
+                    source=record["source"],
+                    description={key: record["value"]},
+                )
+                existing[key] = entry
+                to_create.append(entry)
+            else:
+                entry.description[key] = record["value"]
+                if entry.id is not None:
+                    entry.updated_at = now
+                    to_update[entry.id] = entry
+
+    created = KnowledgeBaseModel.objects.bulk_create(to_create)
+    if to_update:
+        KnowledgeBaseModel.objects.bulk_update(
+            list(to_update.values()),
+            [
+                "answer",
+                "source",
+                "description",
+                "question_normalized",
+                "question_hash",
+                "embedding",
+                "updated_at",
+            ],
+        )
+
+    record_bulk_changes(
+        KnowledgeBaseModel,
+        # Backends that do not return primary keys from bulk inserts get no events.
+        [snapshot(entry) for entry in created if entry.id is not None],
+        ChangeEventActionOptions.CREATED,
+    )
+    record_bulk_changes(
+        KnowledgeBaseModel,
+        [snapshot(entry) for entry in to_update.values()],
+        ChangeEventActionOptions.UPDATED,
+    )
+    report.created += len(created)
+    report.updated += len(to_update)
@@ -0,0 +1,73 @@
+# knowledge_base/cache.py
+import json
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from src.metrics import CACHE_REQUESTS
+
+
+class SystemInfoSnapshot:
+    """Merged INFO data for one cache version, with its JSON encoding."""
+
+    __slots__ = ("version", "data", "json_bytes", "loaded_at")
+
+    def __init__(self, version: int, data: Any):
+        self.version = version
+        self.data = data
+        self.json_bytes = json.dumps(
+            data, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.loaded_at = time.monotonic()
+
+
+class SystemInfoCache:
+    """
+    Process-wide, versioned snapshot of the merged INFO entries.
+
+    The snapshot is reloaded when it is older than `ttl` seconds or after
+    `invalidate()` is called by a knowledge base write. Snapshot data is shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._snapshot: Optional[SystemInfoSnapshot] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, loader: Callable[[], Any]) -> SystemInfoSnapshot:
+        """Return the current snapshot, loading it with `loader` if stale."""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._expired(snapshot):
+            CACHE_REQUESTS.inc("system_info", "hit")
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._expired(snapshot):
+                CACHE_REQUESTS.inc("system_info", "miss")
+                snapshot = SystemInfoSnapshot(self._version, loader())
+                self._snapshot = snapshot
+            else:
+                CACHE_REQUESTS.inc("system_info", "hit")
+            return snapshot
+
+    def peek(self) -> Optional[SystemInfoSnapshot]:
+        """Return the current snapshot without loading, or None if it is stale."""
+        snapshot = self._snapshot
+        if snapshot is None or self._expired(snapshot):
+            return None
+        return snapshot
+
+    def invalidate(self):
+        """Drop the current snapshot so the next read reloads it."""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def _expired(self, snapshot: SystemInfoSnapshot) -> bool:
+        return (
+            snapshot.version != self._version
+            or time.monotonic() - snapshot.loaded_at > self.ttl
+        )
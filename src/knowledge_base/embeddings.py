@@ -0,0 +1,84 @@
+# knowledge_base/embeddings.py
+import re
+import zlib
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+class HashingVectorizer:
+    """
+    CPU-only text embedding by signed feature hashing. Words and their
+    character n-grams are hashed into a fixed number of dimensions and the
+    vector is L2-normalized, so the dot product of two vectors is their cosine
+    similarity. N-grams let questions that share word stems or misspellings
+    score close to each other, which plain word overlap misses.
+    """
+
+    def __init__(self, dim: int = 256, ngram_range: Sequence[int] = (3, 5), ngram_weight: float = 0.5):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.ngram_weight = ngram_weight
+
+    def features(self, text: str) -> Iterator[Tuple[str, float]]:
+        low, high = self.ngram_range
+        for word in WORD_PATTERN.findall(text.lower()):
+            yield "w:" + word, 1.0
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                for start in range(len(padded) - n + 1):
+                    yield padded[start : start + n], self.ngram_weight
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # The low bits pick the dimension, the top bit the sign.
+            vector[digest % self.dim] += weight if digest & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.embed(text)
+        return matrix
+
+    def to_bytes(self, vector: np.ndarray) -> bytes:
+        return vector.astype(np.float32).tobytes()
+
+    def from_bytes(self, raw: Optional[bytes]) -> Optional[np.ndarray]:
+        """Decode a stored vector, or None if it is missing or from another dimension."""
+        if not raw or len(raw) != self.dim * 4:
+            return None
+        return np.frombuffer(bytes(raw), dtype=np.float32)
+
+
+_vectorizer: Optional[HashingVectorizer] = None
+
+
+def get_vectorizer() -> HashingVectorizer:
+    """The vectorizer used both at write time and by the embedding scorer."""
+    global _vectorizer
+    if _vectorizer is None:
+        from django.conf import settings
+
+        _vectorizer = HashingVectorizer(dim=getattr(settings, "KNOWLEDGE_BASE_EMBEDDING_DIM", 256))
+    return _vectorizer
+
+
+def embeddings_enabled() -> bool:
+    """Whether question vectors are needed, i.e. the embedding scorer is configured."""
+    from django.conf import settings
+
+    return getattr(settings, "KNOWLEDGE_BASE_SCORER", "jaccard") == "embedding"
+
+
+def embed_question(question: str) -> bytes:
+    """Encode a knowledge base question for storage alongside its row."""
+    vectorizer = get_vectorizer()
+    return vectorizer.to_bytes(vectorizer.embed(question))
@@ -0,0 +1,216 @@
+# knowledge_base/index.py
+import heapq
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from src.knowledge_base.normalize import normalize_question
+from src.metrics import SEARCH_CANDIDATES, SEARCH_EXACT_HITS
+
+
+# Rough per-object costs used to estimate index memory, in bytes.
+ENTRY_OVERHEAD = 200
+TOKEN_OVERHEAD = 100
+
+
+class IndexedEntry:
+    """
+    A knowledge base entry with its question pre-tokenized for scoring. The
+    stored normalized tokens and hash are used when given, so loading an
+    index does not re-tokenize every question.
+    """
+
+    __slots__ = ("id", "question", "answer", "hash", "tokens", "size")
+
+    def __init__(
+        self,
+        entry_id: int,
+        question: str,
+        answer: str,
+        tokens: Optional[Sequence[str]] = None,
+        digest: Optional[str] = None,
+    ):
+        self.id = entry_id
+        self.question = question
+        self.answer = answer
+        if not tokens or not digest:
+            tokens, digest = normalize_question(question)
+        self.hash = digest
+        self.tokens: FrozenSet[str] = frozenset(tokens)
+        self.size = len(self.tokens)
+
+    def as_result(self, score: float) -> Dict[str, Any]:
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "score": score,
+            "id": str(self.id),
+        }
+
+
+def parse_normalized(normalized: Optional[str]) -> Optional[List[str]]:
+    """Split a stored KnowledgeBase.question_normalized value back into tokens."""
+    return normalized.split() if normalized else None
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over knowledge base questions.
+
+    Maps every token to the ids of the entries whose question contains it, so a
+    search only scores entries that share at least one token with the query.
+    Scores are the Jaccard similarity of normalized token sets. Entries with
+    the same token set as the query are found by hash and returned without
+    scoring anything else.
+    """
+
+    # Scorers name themselves; only named indexes report search metrics.
+    name: Optional[str] = None
+
+    def __init__(self):
+        self._entries: Dict[int, IndexedEntry] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._by_hash: Dict[str, Set[int]] = {}
+        self._lock = threading.RLock()
+        self._memory_estimate = 0
+        self.loaded = False
+        # Bumped on every change so derived structures know when to rebuild.
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, entries: Iterable[Any]):
+        """
+        Replace the index contents with the given (id, question, answer) rows,
+        optionally followed by the stored normalized question and its hash.
+        """
+        with self._lock:
+            self._entries = {}
+            self._postings = {}
+            self._by_hash = {}
+            self._memory_estimate = 0
+            for entry_id, question, answer, *normalized in entries:
+                if normalized:
+                    self._add(entry_id, question, answer, parse_normalized(normalized[0]), normalized[1])
+                else:
+                    self._add(entry_id, question, answer)
+            self.loaded = True
+            self.version += 1
+
+    def upsert(
+        self,
+        entry_id: int,
+        question: Optional[str],
+        answer: str,
+        tokens: Optional[Sequence[str]] = None,
+        digest: Optional[str] = None,
+    ):
+        """Add an entry or replace the indexed version of an existing one."""
+        with self._lock:
+            self._remove(entry_id)
+            self._add(entry_id, question, answer, tokens, digest)
+            self.version += 1
+
+    def remove(self, entry_id: int):
+        """Drop an entry from the index if present."""
+        with self._lock:
+            self._remove(entry_id)
+            self.version += 1
+
+    def memory_estimate(self) -> int:
+        """Approximate bytes held by the indexed entries and their postings."""
+        return self._memory_estimate
+
+    def snapshot(self) -> Tuple[int, List[IndexedEntry]]:
+        """Return the current version and entries ordered by id."""
+        with self._lock:
+            return self.version, sorted(self._entries.values(), key=lambda e: e.id)
+
+    def search(
+        self, question: str, limit: int = 5, threshold: float = 0.3
+    ) -> List[Dict[str, Any]]:
+        """Return the top `limit` entries scoring above `threshold`, best first."""
+        tokens, digest = normalize_question(question)
+        query_tokens = set(tokens)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            exact_ids = self._by_hash.get(digest)
+            if exact_ids:
+                if self.name:
+                    SEARCH_EXACT_HITS.inc(self.name)
+                # Same token set as the query: nothing else can score higher.
+                return [self._entries[entry_id].as_result(1.0) for entry_id in sorted(exact_ids)[:limit]]
+
+            candidates: Set[int] = set()
+            for token in query_tokens:
+                posting = self._postings.get(token)
+                if posting:
+                    candidates.update(posting)
+
+            if self.name:
+                SEARCH_CANDIDATES.observe(len(candidates), self.name)
+            scored = []
+            query_size = len(query_tokens)
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                # Jaccard never exceeds the smaller set size over the larger one.
+                if min(query_size, entry.size) <= threshold * max(query_size, entry.size):
+                    continue
+                intersection = len(query_tokens & entry.tokens)
+                union = query_size + entry.size - intersection
+                score = intersection / union
+                if score > threshold:
+                    # Ties keep the lowest id first, matching the DB scan order.
+                    scored.append((score, -entry_id, entry))
+
+            top = heapq.nlargest(limit, scored, key=lambda item: (item[0], item[1]))
+
+        return [entry.as_result(score) for score, _, entry in top]
+
+    def _add(
+        self,
+        entry_id: int,
+        question: Optional[str],
+        answer: str,
+        tokens: Optional[Sequence[str]] = None,
+        digest: Optional[str] = None,
+    ):
+        if not question:
+            return
+        entry = IndexedEntry(entry_id, question, answer, tokens, digest)
+        if not entry.size:
+            return
+        self._entries[entry_id] = entry
+        self._by_hash.setdefault(entry.hash, set()).add(entry_id)
+        self._memory_estimate += self._entry_cost(entry)
+        for token in entry.tokens:
+            self._postings.setdefault(token, set()).add(entry_id)
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self._memory_estimate -= self._entry_cost(entry)
+        same_hash = self._by_hash.get(entry.hash)
+        if same_hash is not None:
+            same_hash.discard(entry_id)
+            if not same_hash:
+                del self._by_hash[entry.hash]
+        for token in entry.tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(entry_id)
+            if not posting:
+                del self._postings[token]
+
+    @staticmethod
+    def _entry_cost(entry: IndexedEntry) -> int:
+        return (
+            ENTRY_OVERHEAD
+            + 2 * len(entry.question)
+            + len(entry.answer)
+            + TOKEN_OVERHEAD * entry.size
+        )
@@ -1,39 +1,241 @@
 # knowledge_base/knowledge.py
 import traceback
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 import os
+import threading
+import time
+from django.conf import settings
+from django.db.models import Count, Max
+from src.knowledge_base.cache import SystemInfoCache, SystemInfoSnapshot
+from src.knowledge_base.normalize import normalize_question
+from src.knowledge_base.scorers import create_scorer
+from src.metrics import SEARCH_EXACT_HITS, SEARCH_SECONDS
 from src.model_helpers import KnowledgeBaseTypeOptions, QueryRequestStatusOptions, SourceOptions
-from src.models import KnowledgeBase as KnowledgeBaseModel
+from src.models import DEFAULT_TENANT, KnowledgeBase as KnowledgeBaseModel
 import logging
 
 logger = logging.getLogger("app_logger")
 
+
+class KnowledgeBaseRegistry:
+    """
+    Per-tenant KnowledgeBase instances. Each tenant's index is built lazily on
+    first use; once the estimated memory of all tenants exceeds
+    `memory_budget`, or more than `max_tenants` are held, the least recently
+    used tenants are dropped and rebuilt on their next request. A running
+    usage total is kept: a tenant's estimate is refreshed each time it is
+    used, rather than re-summing every tenant on each lookup.
+    """
+
+    def __init__(
+        self,
+        memory_budget: Optional[int] = None,
+        info_cache_ttl: Optional[float] = None,
+        max_tenants: Optional[int] = None,
+    ):
+        if memory_budget is None:
+            memory_budget = getattr(settings, "KNOWLEDGE_BASE_MEMORY_BUDGET", 256 * 1024 * 1024)
+        if max_tenants is None:
+            max_tenants = getattr(settings, "KNOWLEDGE_BASE_MAX_TENANTS", 1000)
+        self.memory_budget = memory_budget
+        self.max_tenants = max_tenants
+        self.info_cache_ttl = info_cache_ttl
+        self._instances: "OrderedDict[str, KnowledgeBase]" = OrderedDict()
+        self._estimates: Dict[str, int] = {}
+        self._usage = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def get(self, tenant: str) -> "KnowledgeBase":
+        """Return the tenant's KnowledgeBase, creating it if needed, and mark it recently used."""
+        with self._lock:
+            knowledge_base = self._instances.get(tenant)
+            if knowledge_base is None:
+                knowledge_base = KnowledgeBase(tenant=tenant, info_cache_ttl=self.info_cache_ttl)
+                self._instances[tenant] = knowledge_base
+            else:
+                self._instances.move_to_end(tenant)
+            self._track(tenant, knowledge_base)
+            self._evict()
+        return knowledge_base
+
+    def put(self, tenant: str, knowledge_base: "KnowledgeBase"):
+        """Replace the tenant's KnowledgeBase, e.g. with a freshly loaded snapshot."""
+        with self._lock:
+            self._instances[tenant] = knowledge_base
+            self._instances.move_to_end(tenant)
+            self._track(tenant, knowledge_base)
+            self._evict()
+
+    def discard(self, tenant: str):
+        """Forget the tenant's KnowledgeBase; it is rebuilt on next use."""
+        with self._lock:
+            self._instances.pop(tenant, None)
+            self._usage -= self._estimates.pop(tenant, 0)
+
+    def peek(self, tenant: str) -> Optional["KnowledgeBase"]:
+        """Return the tenant's KnowledgeBase only if it is already held, without touching LRU order."""
+        return self._instances.get(tenant)
+
+    def tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._instances)
+
+    def memory_estimate(self) -> int:
+        with self._lock:
+            return sum(kb.memory_estimate() for kb in self._instances.values())
+
+    def _track(self, tenant: str, knowledge_base: "KnowledgeBase"):
+        estimate = knowledge_base.memory_estimate()
+        self._usage += estimate - self._estimates.get(tenant, 0)
+        self._estimates[tenant] = estimate
+
+    def _evict(self):
+        # The most recently used tenant is always kept, even over budget.
+        while len(self._instances) > 1 and (
+            self._usage > self.memory_budget or len(self._instances) > self.max_tenants
+        ):
+            tenant, _ = self._instances.popitem(last=False)
+            self._usage -= self._estimates.pop(tenant, 0)
+            logger.info(f"Evicted knowledge base for tenant {tenant} to stay within memory budget")
+
+
+_registry = KnowledgeBaseRegistry()
+
+
+def get_knowledge_base(tenant: Optional[str] = None) -> "KnowledgeBase":
+    """
+    Return the process-wide KnowledgeBase of a tenant, shared by views, admin,
+    Celery tasks and management commands, so its index and caches are built
+    once. Without a tenant the DEFAULT_TENANT salon is used.
+    """
+    return _registry.get(tenant or DEFAULT_TENANT)
+
+
+def is_known_tenant(tenant: str) -> bool:
+    """
+    Whether a tenant named by a request is a salon this deployment serves:
+    DEFAULT_TENANT, one already held by the registry, or one with knowledge
+    base entries. Checked before a request touches the registry, so made-up
+    tenants do not take up registry slots.
+    """
+    if tenant == DEFAULT_TENANT or _registry.peek(tenant) is not None:
+        return True
+    if not tenant or len(tenant) > 64:
+        return False
+    return KnowledgeBaseModel.objects.filter(tenant=tenant).exists()
+
+
+def read_fingerprint(tenant: str) -> Tuple[Any, ...]:
+    """
+    Cheap summary of a tenant's rows, (count, last id, last update), that
+    changes on every insert, update or delete made by any process.
+    """
+    summary = KnowledgeBaseModel.objects.filter(tenant=tenant).aggregate(
+        count=Count("id"), last_id=Max("id"), last_update=Max("updated_at")
+    )
+    return summary["count"], summary["last_id"], summary["last_update"]
+
+
+def get_loaded_knowledge_base(tenant: Optional[str] = None) -> Optional["KnowledgeBase"]:
+    """Return a tenant's KnowledgeBase if this process holds one, without creating it."""
+    return _registry.peek(tenant or DEFAULT_TENANT)
+
+
+def get_knowledge_base_registry() -> KnowledgeBaseRegistry:
+    return _registry
+
+
 class KnowledgeBase:
-    """Manages the knowledge base for the AI agent."""
+    """Manages the knowledge base of one tenant for the AI agent."""
+
+    def __init__(
+        self,
+        tenant: str = DEFAULT_TENANT,
+        info_cache_ttl: Optional[float] = None,
+        freshness_interval: Optional[float] = None,
+    ):
+        """Initialize the in-memory query index and system information cache."""
+        self.tenant = tenant
+        # Scores questions against QUERY entries; chosen by KNOWLEDGE_BASE_SCORER.
+        self._query_index = create_scorer()
+        self._query_index_load_lock = threading.Lock()
+        # Other processes write the same rows, so the index is compared with
+        # the database fingerprint at most every `freshness_interval` seconds.
+        if freshness_interval is None:
+            freshness_interval = getattr(settings, "KNOWLEDGE_BASE_FRESHNESS_INTERVAL", 1)
+        self.freshness_interval = freshness_interval
+        self._fingerprint: Optional[Tuple[Any, ...]] = None
+        self._checked_at = 0.0
+        # Merged INFO entries, invalidated by the model signals in src/signals.py.
+        if info_cache_ttl is None:
+            info_cache_ttl = getattr(settings, "KNOWLEDGE_BASE_INFO_CACHE_TTL", 300)
+        self._system_info_cache = SystemInfoCache(ttl=info_cache_ttl)
+
+    @property
+    def knowledge_collection(self):
+        """A fresh queryset over this tenant's knowledge base entries."""
+        return KnowledgeBaseModel.objects.filter(tenant=self.tenant)
+
+    def memory_estimate(self) -> int:
+        """Approximate bytes held by the query index and cached system information."""
+        snapshot = self._system_info_cache.peek()
+        info_bytes = 3 * len(snapshot.json_bytes) if snapshot is not None else 0
+        return self._query_index.memory_estimate() + info_bytes
 
-    def __init__(self):
-        """Initialize with database connection and optional initial knowledge."""
-        self.knowledge_collection = KnowledgeBaseModel.objects.all()
+    def warm_up(self):
+        """Build the query index and load system information ahead of the first request."""
+        self._get_query_index()
+        self.get_system_information_snapshot()
+
+    @property
+    def is_warm(self) -> bool:
+        """True when a search can be answered from memory without touching the database."""
+        return self._query_index.loaded and self._system_info_cache.peek() is not None
+
+    def reload(self):
+        """Rebuild every in-memory structure from the database."""
+        with self._query_index_load_lock:
+            self.rebuild_index()
+        self.invalidate_system_information()
+        self.get_system_information_snapshot()
 
     def get_system_information(self) -> Dict[str, Any]:
         """Retrieve system information from the knowledge base."""
         try:
-            all_information = {}
-            system_info = self.knowledge_collection.filter(type=KnowledgeBaseTypeOptions.INFO)
-            if system_info:
-                for info in system_info:
-                    if info.description:
-                        all_information.update(info.description)
-                return all_information
-
-            else:
-                return "No system information available."
+            return self.get_system_information_snapshot().data
         except Exception as e:
             logger.error(f"Error retrieving system information: {traceback.format_exc()}")
             return str(e)
 
+    def get_system_information_snapshot(self) -> SystemInfoSnapshot:
+        """Return the cached system information along with its JSON encoding."""
+        if self._query_index.loaded:
+            self._refresh_if_stale()
+        return self._system_info_cache.get(self._load_system_information)
+
+    def _load_system_information(self):
+        """Merge the description of every INFO entry into a single dict."""
+        all_information = {}
+        system_info = self.knowledge_collection.filter(
+            type=KnowledgeBaseTypeOptions.INFO
+        ).values_list("description", flat=True)
+        if not system_info:
+            return "No system information available."
+        for description in system_info:
+            if description:
+                all_information.update(description)
+        return all_information
+
+    def invalidate_system_information(self):
+        """Force the next system information read to reload from the database."""
+        self._system_info_cache.invalidate()
+
     def add_or_update_knowledge(
         self,
         question: str = "",
@@ -64,6 +266,7 @@ class KnowledgeBase:
                     return True, existing_entry.id
 
                 knowledge_entry = KnowledgeBaseModel.objects.create(
+                    tenant=self.tenant,
                     question=question,
                     answer=answer,
                     type=type,
@@ -89,6 +292,7 @@ class KnowledgeBase:
 
                 # Create new knowledge entry with an empty description {} if none provided
                 knowledge_entry = KnowledgeBaseModel.objects.create(
+                    tenant=self.tenant,
                     question=question,
                     answer=answer,
                     type=type,
@@ -101,71 +305,127 @@ class KnowledgeBase:
             print(f"Error adding/updating knowledge: {traceback.format_exc()}")
             return False, str(e)
 
+    def _get_query_index(self):
+        """Return the shared query index, building it from the database on first use."""
+        if self._query_index.loaded:
+            self._refresh_if_stale()
+        if not self._query_index.loaded:
+            with self._query_index_load_lock:
+                if not self._query_index.loaded:
+                    self.rebuild_index()
+        return self._query_index
+
+    def rebuild_index(self):
+        """Rebuild the shared query index from all QUERY type entries."""
+        # Read first: a write landing during the build only causes one more rebuild.
+        fingerprint = read_fingerprint(self.tenant)
+        rows = self.knowledge_collection.filter(
+            type=KnowledgeBaseTypeOptions.QUERY
+        ).values_list(*self._query_index.fields)
+        self._query_index.build(rows.iterator())
+        self._fingerprint = fingerprint
+        self._checked_at = time.monotonic()
+        logger.info(
+            f"Built knowledge base query index for tenant {self.tenant} "
+            f"with {len(self._query_index)} entries"
+        )
+
+    def sync_entry(self, entry: KnowledgeBaseModel, created: bool = False):
+        """Reflect a saved entry in the shared query index."""
+        if not self._query_index.loaded:
+            return
+        if entry.type == KnowledgeBaseTypeOptions.QUERY:
+            self._query_index.upsert_entry(entry)
+        else:
+            self._query_index.remove(entry.id)
+        # Expect the fingerprint this write leaves behind, so the freshness
+        # check only rebuilds for writes made elsewhere.
+        if self._fingerprint is not None:
+            count, last_id, last_update = self._fingerprint
+            if created:
+                count += 1
+                last_id = max(last_id or 0, entry.id)
+            if entry.updated_at is not None:
+                last_update = max(last_update, entry.updated_at) if last_update else entry.updated_at
+            self._fingerprint = (count, last_id, last_update)
+
+    def remove_entry(self, entry_id: int):
+        """Drop a deleted entry from the shared query index."""
+        if not self._query_index.loaded:
+            return
+        self._query_index.remove(entry_id)
+        if self._fingerprint is not None:
+            count, last_id, last_update = self._fingerprint
+            # Deleting the newest row changes the last id unpredictably; rebuild then.
+            self._fingerprint = (count - 1, last_id, last_update) if entry_id != last_id else None
+
+    def _refresh_if_stale(self):
+        """
+        Rebuild the index and drop cached system information when the
+        tenant's rows changed in another process (other workers, Celery,
+        admin, import_knowledge), checked at most every `freshness_interval`
+        seconds.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.freshness_interval:
+            return
+        self._checked_at = now
+        known = self._fingerprint
+        if read_fingerprint(self.tenant) == known:
+            return
+        with self._query_index_load_lock:
+            # Another thread may have rebuilt while this one waited.
+            if self._fingerprint is not known:
+                return
+            logger.info(f"Knowledge base for tenant {self.tenant} changed elsewhere, rebuilding index")
+            self.rebuild_index()
+        self.invalidate_system_information()
+
     def _find_similar_entries(self, question: str) -> List[Dict[str, Any]]:
         """Find knowledge base entries similar to the question."""
         try:
-            # Get all query type entries from the knowledge base
-            all_queries = self.knowledge_collection.filter(type=KnowledgeBaseTypeOptions.QUERY)
-            
-            # Calculate similarity scores for each entry
-            similar_entries = []
-            for entry in all_queries:
-                if not entry.question:
-                    continue
-                    
-                similarity_score = self._calculate_similarity(entry.question, question)
-                
-                if similarity_score > 0.3:  # Threshold for similarity
-                    similar_entries.append({
-                        "question": entry.question,
-                        "answer": entry.answer,
-                        "score": similarity_score,
-                        "id": str(entry.id)
-                    })
-            
-            # Sort by similarity score in descending order and return top 5
-            similar_entries.sort(key=lambda x: x["score"], reverse=True)
-            return similar_entries[:5]
-            
+            with SEARCH_SECONDS.time(self._query_index.name, "single"):
+                if not self._query_index.loaded:
+                    # A cold tenant can answer a repeated question from the hash
+                    # index without building its in-memory scorer.
+                    exact = self._find_exact_entries(question, limit=5)
+                    if exact:
+                        SEARCH_EXACT_HITS.inc("database")
+                        return exact
+                index = self._get_query_index()
+                return index.search(question, limit=5, threshold=index.default_threshold)
         except Exception as e:
             print(f"Error finding similar entries: {traceback.format_exc()}")
             return []
 
-    def _calculate_similarity(self, db_question: str, user_question: str) -> float:
-        """
-        Calculate similarity between database question and user question.
-        Returns a float value between 0 and 1, where 1 means identical.
-        """
+    def _find_exact_entries(self, question: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Entries whose normalized question matches exactly, looked up by hash."""
+        tokens, digest = normalize_question(question)
+        if not tokens:
+            return []
+        rows = (
+            self.knowledge_collection.filter(type=KnowledgeBaseTypeOptions.QUERY, question_hash=digest)
+            .order_by("id")
+            .values_list("id", "question", "answer")[:limit]
+        )
+        return [
+            {"question": entry_question, "answer": answer, "score": 1.0, "id": str(entry_id)}
+            for entry_id, entry_question, answer in rows
+        ]
+
+    def find_similar_entries_batch(
+        self, questions: List[str], limit: int = 5, threshold: Optional[float] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Find similar entries for many questions in one pass over the scorer."""
         try:
-            # Convert questions to lowercase for better comparison
-            db_question_lower = db_question.lower()
-            user_question_lower = user_question.lower()
-            
-            # Simple word overlap similarity
-            db_words = set(db_question_lower.split())
-            user_words = set(user_question_lower.split())
-            
-            # Check for empty sets to avoid division by zero
-            if not db_words or not user_words:
-                return 0.0
-                
-            # Calculate Jaccard similarity (intersection over union)
-            intersection = len(db_words.intersection(user_words))
-            union = len(db_words.union(user_words))
-            
-            jaccard_similarity = intersection / union if union > 0 else 0
-            
-            # Simple exact match bonus
-            exact_match_bonus = 0.3 if db_question_lower == user_question_lower else 0
-            
-            # Calculate final similarity score (capped at 1.0)
-            similarity = min(jaccard_similarity + exact_match_bonus, 1.0)
-            
-            return similarity
-            
+            with SEARCH_SECONDS.time(self._query_index.name, "batch"):
+                index = self._get_query_index()
+                if threshold is None:
+                    threshold = index.default_threshold
+                return index.search_batch(questions, limit=limit, threshold=threshold)
         except Exception as e:
-            print(f"Error calculating similarity: {traceback.format_exc()}")
-            return 0.0
+            logger.error(f"Error batch scoring similar entries: {traceback.format_exc()}")
+            return [[] for _ in questions]
 
     def get_resolved_queries(self) -> List[Dict[str, Any]]:
         """Retrieve all resolved queries from the knowledge base."""
@@ -0,0 +1,95 @@
+# knowledge_base/matrix.py
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from src.knowledge_base.index import IndexedEntry
+from src.knowledge_base.normalize import normalize_question
+
+
+class QuestionMatrix:
+    """
+    Knowledge base questions encoded as a sparse binary term matrix (CSR).
+
+    Scoring a batch of queries is one sparse product giving the token
+    intersection counts for every (query, entry) pair; Jaccard is then derived
+    from the precomputed row sizes. Scores match InvertedIndex.search,
+    including its exact hash short-circuit.
+    """
+
+    def __init__(self, version: int, entries: Sequence[IndexedEntry]):
+        self.version = version
+        self.entries = list(entries)
+        self.vocabulary: Dict[str, int] = {}
+
+        indptr = [0]
+        indices: List[int] = []
+        for entry in self.entries:
+            for token in entry.tokens:
+                indices.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+            indptr.append(len(indices))
+
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr),
+            shape=(len(self.entries), max(len(self.vocabulary), 1)),
+        )
+        self.row_sizes = np.fromiter(
+            (entry.size for entry in self.entries), dtype=np.float64, count=len(self.entries)
+        )
+        self.ids = np.fromiter(
+            (entry.id for entry in self.entries), dtype=np.int64, count=len(self.entries)
+        )
+        self._rows_by_hash: Dict[str, List[int]] = {}
+        for row, entry in enumerate(self.entries):
+            self._rows_by_hash.setdefault(entry.hash, []).append(row)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def score_batch(
+        self, questions: Sequence[str], limit: int = 5, threshold: float = 0.3
+    ) -> List[List[Dict[str, Any]]]:
+        """Return the top `limit` entries above `threshold` for each question."""
+        if not questions:
+            return []
+
+        normalized = [normalize_question(question) for question in questions]
+        query_sizes = np.zeros(len(questions), dtype=np.float64)
+        indptr = [0]
+        indices: List[int] = []
+        for position, (tokens, _) in enumerate(normalized):
+            query_sizes[position] = len(tokens)
+            indices.extend(
+                self.vocabulary[token] for token in tokens if token in self.vocabulary
+            )
+            indptr.append(len(indices))
+
+        queries = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr),
+            shape=(len(questions), self.matrix.shape[1]),
+        )
+        intersections = (queries @ self.matrix.T).tocsr()
+
+        results = []
+        for position, (tokens, digest) in enumerate(normalized):
+            exact_rows = self._rows_by_hash.get(digest) if tokens else None
+            if exact_rows:
+                # Rows are ordered by id, so this keeps the lowest ids first.
+                results.append([self.entries[row].as_result(1.0) for row in exact_rows[:limit]])
+                continue
+
+            start, end = intersections.indptr[position], intersections.indptr[position + 1]
+            rows = intersections.indices[start:end]
+            counts = intersections.data[start:end].astype(np.float64)
+            if not len(rows):
+                results.append([])
+                continue
+
+            scores = counts / (query_sizes[position] + self.row_sizes[rows] - counts)
+            keep = scores > threshold
+            rows, scores = rows[keep], scores[keep]
+            # Best score first, ties broken by lowest id like the DB scan order.
+            order = np.lexsort((self.ids[rows], -scores))[:limit]
+            results.append([self.entries[rows[i]].as_result(float(scores[i])) for i in order])
+        return results
@@ -0,0 +1,62 @@
+# knowledge_base/normalize.py
+import hashlib
+import re
+from typing import List, Tuple
+
+from django.conf import settings
+
+NON_WORD = re.compile(r"[^\w\s]")
+# Longest first, so "classes" loses "es" rather than "s".
+STEM_SUFFIXES = ("ing", "es", "ed", "s")
+# Function words that may differ between two wordings of the same question.
+STOPWORDS = frozenset(
+    "a an the this that these those my your our their it its is are am was be do does did "
+    "i you we they me us on in at for of to from by with any some there here please".split()
+)
+
+
+def stem(token: str) -> str:
+    """Strip a common English suffix, keeping at least three characters."""
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, drop punctuation and split; stem when KNOWLEDGE_BASE_STEM_TOKENS is set."""
+    tokens = NON_WORD.sub(" ", text.lower()).split()
+    # The voice agent may run without Django settings; it then never stems.
+    if settings.configured and getattr(settings, "KNOWLEDGE_BASE_STEM_TOKENS", False):
+        tokens = [stem(token) for token in tokens]
+    return tokens
+
+
+def question_hash(tokens: List[str]) -> str:
+    """Stable 64-bit hex digest of a normalized token list."""
+    return hashlib.blake2b(" ".join(tokens).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def normalize_question(text: str) -> Tuple[List[str], str]:
+    """
+    Return the sorted distinct tokens of a question and their hash. Two
+    questions with the same hash have the same token set, so their word
+    overlap score is 1.
+    """
+    tokens = sorted(set(tokenize(text or "")))
+    return tokens, question_hash(tokens)
+
+
+def is_near_duplicate(tokens: List[str], other: List[str]) -> bool:
+    """
+    Whether two normalized token lists have the same length and differ in at
+    most one token on each side, that token being a stopword. "open on sunday"
+    matches "open this sunday"; "open on sunday" never matches "close on sunday".
+    """
+    ours, theirs = set(tokens), set(other)
+    if len(ours) != len(theirs):
+        return False
+    only_ours, only_theirs = ours - theirs, theirs - ours
+    if len(only_ours) > 1:
+        return False
+    return only_ours <= STOPWORDS and only_theirs <= STOPWORDS
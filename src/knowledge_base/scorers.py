@@ -0,0 +1,348 @@
+# knowledge_base/scorers.py
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from src.knowledge_base.embeddings import HashingVectorizer, get_vectorizer
+from src.knowledge_base.index import ENTRY_OVERHEAD, InvertedIndex, parse_normalized
+from src.knowledge_base.matrix import QuestionMatrix
+from src.knowledge_base.normalize import normalize_question
+from src.metrics import SEARCH_CANDIDATES, SEARCH_EXACT_HITS
+import logging
+
+logger = logging.getLogger("app_logger")
+
+# Below this many entries the embedding scorer compares against every vector;
+# the approximate index only pays off on larger knowledge bases.
+ANN_MIN_ENTRIES = 2000
+
+
+class JaccardScorer(InvertedIndex):
+    """
+    Word-overlap scorer: Jaccard similarity over normalized tokens. Single
+    queries go through the inverted index, batches through a sparse matrix
+    rebuilt lazily whenever the index version moves on.
+    """
+
+    name = "jaccard"
+    fields = ("id", "question", "answer", "question_normalized", "question_hash")
+    default_threshold = 0.3
+
+    def __init__(self):
+        super().__init__()
+        self._question_matrix: Optional[QuestionMatrix] = None
+        self._question_matrix_lock = threading.Lock()
+
+    def upsert_entry(self, entry):
+        self.upsert(
+            entry.id,
+            entry.question,
+            entry.answer,
+            parse_normalized(entry.question_normalized),
+            entry.question_hash,
+        )
+
+    def search_batch(
+        self, questions: Sequence[str], limit: int = 5, threshold: float = 0.3
+    ) -> List[List[Dict[str, Any]]]:
+        return self._get_question_matrix().score_batch(questions, limit=limit, threshold=threshold)
+
+    def _get_question_matrix(self) -> QuestionMatrix:
+        """Return the batch scoring matrix for the current index version."""
+        matrix = self._question_matrix
+        if matrix is None or matrix.version != self.version:
+            with self._question_matrix_lock:
+                matrix = self._question_matrix
+                if matrix is None or matrix.version != self.version:
+                    matrix = QuestionMatrix(*self.snapshot())
+                    self._question_matrix = matrix
+        return matrix
+
+
+class VectorStore:
+    """
+    Fixed-width float32 vectors in a memory-mapped file, addressed by row.
+    Capacity doubles as rows are added; freed rows are reused. The backing
+    file is unlinked once mapped, so nothing is left behind on exit.
+    """
+
+    def __init__(self, dim: int, directory: Optional[str] = None, capacity: int = 1024):
+        self.dim = dim
+        self.directory = directory
+        self.vectors = self._allocate(capacity)
+        self.size = 0
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return self.size - len(self._free)
+
+    def add(self, vector: np.ndarray) -> int:
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self.size == len(self.vectors):
+                grown = self._allocate(2 * len(self.vectors))
+                grown[: self.size] = self.vectors[: self.size]
+                self.vectors = grown
+            row = self.size
+            self.size += 1
+        self.vectors[row] = vector
+        return row
+
+    def set(self, row: int, vector: np.ndarray):
+        self.vectors[row] = vector
+
+    def free(self, row: int):
+        self.vectors[row] = 0
+        self._free.append(row)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        fd, path = tempfile.mkstemp(prefix="kb-vectors-", suffix=".f32", dir=self.directory)
+        try:
+            os.close(fd)
+            return np.memmap(path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        finally:
+            os.unlink(path)
+
+
+class HyperplaneLSH:
+    """
+    Approximate nearest neighbours by random-hyperplane hashing. Each table
+    buckets vectors by the signs of `bits` random projections; a query looks at
+    its own bucket and the buckets one bit away in every table.
+    """
+
+    def __init__(self, dim: int, tables: int = 8, bits: int = 12, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.weights = 1 << np.arange(bits, dtype=np.int64)
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(tables)]
+        self._keys: Dict[int, np.ndarray] = {}
+
+    def _hash(self, vector: np.ndarray) -> np.ndarray:
+        return ((self.planes @ vector) > 0).astype(np.int64) @ self.weights
+
+    def add(self, row: int, vector: np.ndarray):
+        keys = self._hash(vector)
+        self._keys[row] = keys
+        for table, key in enumerate(keys):
+            self._buckets[table].setdefault(int(key), set()).add(row)
+
+    def remove(self, row: int):
+        keys = self._keys.pop(row, None)
+        if keys is None:
+            return
+        for table, key in enumerate(keys):
+            bucket = self._buckets[table].get(int(key))
+            if bucket is not None:
+                bucket.discard(row)
+                if not bucket:
+                    del self._buckets[table][int(key)]
+
+    def candidates(self, vector: np.ndarray) -> Set[int]:
+        rows: Set[int] = set()
+        for table, key in enumerate(self._hash(vector)):
+            buckets = self._buckets[table]
+            for probe in (int(key), *(int(key) ^ int(bit) for bit in self.weights)):
+                bucket = buckets.get(probe)
+                if bucket:
+                    rows.update(bucket)
+        return rows
+
+
+class EmbeddingScorer:
+    """
+    Cosine similarity between question embeddings. Entry vectors are computed
+    when the row is written (KnowledgeBase.embedding) and only read here;
+    queries are embedded with the same vectorizer. Large knowledge bases are
+    searched through an LSH index, small ones exhaustively. As with the
+    Jaccard scorer, entries whose normalized question hash equals the query's
+    are returned without scoring.
+    """
+
+    name = "embedding"
+    fields = ("id", "question", "answer", "embedding", "question_hash")
+
+    def __init__(self, vectorizer: Optional[HashingVectorizer] = None, directory: Optional[str] = None):
+        self.vectorizer = vectorizer or get_vectorizer()
+        self.default_threshold = getattr(settings, "KNOWLEDGE_BASE_EMBEDDING_THRESHOLD", 0.5)
+        self.directory = directory or getattr(settings, "KNOWLEDGE_BASE_VECTOR_DIR", None)
+        self._lock = threading.RLock()
+        self._reset()
+        self.loaded = False
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _reset(self):
+        self._store = VectorStore(self.vectorizer.dim, self.directory)
+        self._ann = HyperplaneLSH(self.vectorizer.dim)
+        self._rows: Dict[int, int] = {}
+        self._entries: Dict[int, Tuple[int, str, str]] = {}
+        self._by_hash: Dict[str, Set[int]] = {}
+        self._hashes: Dict[int, str] = {}
+        self._text_bytes = 0
+
+    def build(self, entries: Iterable[Any]):
+        """Replace the contents with the given (id, question, answer, embedding, hash) rows."""
+        with self._lock:
+            self._reset()
+            missing = 0
+            for entry_id, question, answer, embedding, digest in entries:
+                vector = self.vectorizer.from_bytes(embedding)
+                if vector is None and question:
+                    missing += 1
+                self._add(entry_id, question, answer, vector, digest)
+            self.loaded = True
+            self.version += 1
+        if missing:
+            logger.warning(f"Embedded {missing} knowledge base questions that had no stored vector")
+
+    def upsert_entry(self, entry):
+        self.upsert(entry.id, entry.question, entry.answer, entry.embedding, entry.question_hash)
+
+    def upsert(
+        self,
+        entry_id: int,
+        question: Optional[str],
+        answer: str,
+        embedding: Optional[bytes] = None,
+        digest: Optional[str] = None,
+    ):
+        with self._lock:
+            self._remove(entry_id)
+            self._add(entry_id, question, answer, self.vectorizer.from_bytes(embedding), digest)
+            self.version += 1
+
+    def remove(self, entry_id: int):
+        with self._lock:
+            self._remove(entry_id)
+            self.version += 1
+
+    def memory_estimate(self) -> int:
+        return self._store.nbytes + self._text_bytes + ENTRY_OVERHEAD * len(self._rows)
+
+    def search(self, question: str, limit: int = 5, threshold: float = 0.5) -> List[Dict[str, Any]]:
+        return self.search_batch([question], limit=limit, threshold=threshold)[0]
+
+    def search_batch(
+        self, questions: Sequence[str], limit: int = 5, threshold: float = 0.5
+    ) -> List[List[Dict[str, Any]]]:
+        queries = self.vectorizer.embed_batch(questions)
+        with self._lock:
+            if not self._rows:
+                return [[] for _ in questions]
+            exact = [self._exact(question, limit) for question in questions]
+            if len(self._rows) < ANN_MIN_ENTRIES:
+                for hits in exact:
+                    if not hits:
+                        SEARCH_CANDIDATES.observe(len(self._rows), self.name)
+                scores = queries @ self._store.vectors[: self._store.size].T
+                return [
+                    hits or self._top(np.arange(self._store.size), row, limit, threshold)
+                    for hits, row in zip(exact, scores)
+                ]
+
+            results = []
+            for hits, query in zip(exact, queries):
+                if hits:
+                    results.append(hits)
+                    continue
+                rows = np.fromiter(self._ann.candidates(query), dtype=np.int64)
+                SEARCH_CANDIDATES.observe(len(rows), self.name)
+                if not len(rows):
+                    results.append([])
+                    continue
+                scores = self._store.vectors[rows] @ query
+                results.append(self._top(rows, scores, limit, threshold))
+            return results
+
+    def _exact(self, question: str, limit: int) -> List[Dict[str, Any]]:
+        tokens, digest = normalize_question(question)
+        entry_ids = self._by_hash.get(digest) if tokens else None
+        if not entry_ids:
+            return []
+        SEARCH_EXACT_HITS.inc(self.name)
+        results = []
+        for entry_id in sorted(entry_ids)[:limit]:
+            _, entry_question, answer = self._entries[self._rows[entry_id]]
+            results.append({"question": entry_question, "answer": answer, "score": 1.0, "id": str(entry_id)})
+        return results
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, limit: int, threshold: float) -> List[Dict[str, Any]]:
+        keep = scores > threshold
+        rows, scores = rows[keep], scores[keep]
+        results = []
+        for i in np.argsort(-scores, kind="stable"):
+            entry = self._entries.get(int(rows[i]))
+            # Freed rows are zero vectors and never pass the threshold.
+            if entry is None:
+                continue
+            entry_id, question, answer = entry
+            results.append(
+                {"question": question, "answer": answer, "score": float(scores[i]), "id": str(entry_id)}
+            )
+            if len(results) == limit:
+                break
+        return results
+
+    def _add(
+        self,
+        entry_id: int,
+        question: Optional[str],
+        answer: str,
+        vector: Optional[np.ndarray],
+        digest: Optional[str] = None,
+    ):
+        if not question:
+            return
+        if vector is None:
+            vector = self.vectorizer.embed(question)
+        if not vector.any():
+            return
+        if not digest:
+            _, digest = normalize_question(question)
+        row = self._store.add(vector)
+        self._rows[entry_id] = row
+        self._hashes[entry_id] = digest
+        self._by_hash.setdefault(digest, set()).add(entry_id)
+        self._entries[row] = (entry_id, question, answer)
+        self._text_bytes += 2 * len(question) + len(answer)
+        self._ann.add(row, vector)
+
+    def _remove(self, entry_id: int):
+        row = self._rows.pop(entry_id, None)
+        if row is None:
+            return
+        digest = self._hashes.pop(entry_id)
+        same_hash = self._by_hash[digest]
+        same_hash.discard(entry_id)
+        if not same_hash:
+            del self._by_hash[digest]
+        _, question, answer = self._entries.pop(row)
+        self._text_bytes -= 2 * len(question) + len(answer)
+        self._ann.remove(row)
+        self._store.free(row)
+
+
+SCORERS = {
+    JaccardScorer.name: JaccardScorer,
+    EmbeddingScorer.name: EmbeddingScorer,
+}
+
+
+def create_scorer(name: Optional[str] = None):
+    """Instantiate the scorer named by KNOWLEDGE_BASE_SCORER."""
+    name = name or getattr(settings, "KNOWLEDGE_BASE_SCORER", JaccardScorer.name)
+    try:
+        return SCORERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown knowledge base scorer: {name}")
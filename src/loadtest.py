@@ -0,0 +1,227 @@
+# src/loadtest.py
+import asyncio
+import bisect
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+from aiohttp import web
+from src.knowledge_base.benchmark import latency_summary
+import logging
+
+logger = logging.getLogger("app_logger")
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+# Error bodies that mean a request waited on a database lock.
+LOCK_ERRORS = ("database is locked", "deadlock detected", "could not serialize", "lock timeout")
+
+
+class EndpointStats:
+    """Latencies, status codes and lock errors of one endpoint."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.lock_errors = 0
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def record(self, seconds: float, status: str, body: str = ""):
+        self.samples.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.histogram[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, seconds * 1000)] += 1
+        if not status.startswith("2"):
+            self.errors += 1
+            if any(marker in body for marker in LOCK_ERRORS):
+                self.lock_errors += 1
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        count = len(self.samples)
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        return {
+            "requests": count,
+            "per_second": round(count / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "lock_errors": self.lock_errors,
+            "statuses": self.statuses,
+            "latency": latency_summary(self.samples),
+            "histogram": {label: n for label, n in zip(labels, self.histogram) if n},
+        }
+
+
+class WebhookReceiver:
+    """
+    Stand-in for the NOTIFICATION_WEBHOOK_URL endpoint. Accepts every POST and
+    counts the notifications inside, unwrapping notification_batch requests.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8799):
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.notifications: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        notifications = body.get("notifications", [body]) if body.get("type") == "notification_batch" else [body]
+        for notification in notifications:
+            kind = notification.get("type", "unknown")
+            self.notifications[kind] = self.notifications.get(kind, 0) + 1
+        return web.Response(status=200)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "notifications": sum(self.notifications.values()),
+            "by_type": self.notifications,
+        }
+
+
+class LoadTest:
+    """
+    Simulated voice calls against the agent tool endpoints, using the request
+    shapes of src/agents/livekit_agent.py. Every call takes turns separated by
+    exponentially distributed think time; each turn is a search-query and, at
+    `escalation_rate`, a create-query. A supervisor loop resolves escalations
+    and posts their answers through add-knowledge every `answer_interval`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        questions: Sequence[str],
+        tenant: str,
+        user_id: str = "1",
+        calls: int = 20,
+        duration: float = 60.0,
+        turn_interval: float = 3.0,
+        turns_per_call: Sequence[int] = (3, 8),
+        escalation_rate: float = 0.1,
+        answer_interval: float = 5.0,
+        async_endpoints: bool = False,
+        seed: int = 0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.questions = list(questions)
+        self.tenant = tenant
+        self.user_id = user_id
+        self.calls = calls
+        self.duration = duration
+        self.turn_interval = turn_interval
+        self.turns_per_call = turns_per_call
+        self.escalation_rate = escalation_rate
+        self.answer_interval = answer_interval
+        self.prefix = "async/" if async_endpoints else ""
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, EndpointStats] = {}
+        self.calls_completed = 0
+        self._escalations: "asyncio.Queue[tuple]" = asyncio.Queue()
+
+    async def run(self) -> Dict[str, Any]:
+        connector = aiohttp.TCPConnector(limit=max(self.calls * 2, 10))
+        timeout = aiohttp.ClientTimeout(total=30)
+        self._deadline = time.monotonic() + self.duration
+        started = time.monotonic()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            tasks = [asyncio.create_task(self._call_loop(session)) for _ in range(self.calls)]
+            if self.answer_interval > 0:
+                tasks.append(asyncio.create_task(self._supervisor_loop(session)))
+            await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "calls_completed": self.calls_completed,
+            "endpoints": {name: stats.as_dict(elapsed) for name, stats in sorted(self.stats.items())},
+        }
+
+    async def _call_loop(self, session: aiohttp.ClientSession):
+        # Stagger call starts so the first turns do not all land together.
+        await asyncio.sleep(self.rng.uniform(0, self.turn_interval))
+        while time.monotonic() < self._deadline:
+            for _ in range(self.rng.randint(*self.turns_per_call)):
+                if time.monotonic() >= self._deadline:
+                    return
+                question = self.rng.choice(self.questions)
+                await self._request(
+                    session,
+                    "search-query",
+                    "GET",
+                    f"{self.prefix}knowledge-base/search-query/",
+                    params={"query": question, "tenant": self.tenant},
+                )
+                if self.rng.random() < self.escalation_rate:
+                    status, body = await self._request(
+                        session,
+                        "create-query",
+                        "POST",
+                        f"{self.prefix}query-request/create-query/",
+                        json={"user_id": self.user_id, "question": question, "tenant": self.tenant},
+                    )
+                    if status == 201 and isinstance(body, dict):
+                        self._escalations.put_nowait((body["id"], question))
+                await asyncio.sleep(self.rng.expovariate(1 / self.turn_interval))
+            self.calls_completed += 1
+
+    async def _supervisor_loop(self, session: aiohttp.ClientSession):
+        while time.monotonic() < self._deadline:
+            await asyncio.sleep(self.answer_interval)
+            try:
+                query_id, question = self._escalations.get_nowait()
+            except asyncio.QueueEmpty:
+                continue
+            status, _ = await self._request(
+                session, "resolve-query", "POST", "query-request/resolve-query/", json={"query_id": query_id}
+            )
+            if status != 200:
+                continue
+            await self._request(
+                session,
+                "add-knowledge",
+                "POST",
+                f"{self.prefix}knowledge-base/add-knowledge/",
+                json={
+                    "question": question,
+                    "answer": f"Load test answer to query {query_id}",
+                    "source": "SUPERVISOR",
+                    "query_request_id": query_id,
+                    "tenant": self.tenant,
+                },
+            )
+
+    async def _request(self, session, name: str, method: str, path: str, **kwargs):
+        stats = self.stats.setdefault(name, EndpointStats())
+        started = time.perf_counter()
+        try:
+            async with session.request(method, f"{self.base_url}/{path}", **kwargs) as response:
+                text = await response.text()
+                stats.record(time.perf_counter() - started, str(response.status), text)
+                try:
+                    return response.status, await response.json(content_type=None)
+                except ValueError:
+                    return response.status, None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            stats.record(time.perf_counter() - started, type(e).__name__)
+            return None, None
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from src.knowledge_base.embeddings import embeddings_enabled
+from src.model_helpers import KnowledgeBaseTypeOptions
+from src.models import KnowledgeBase
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the normalized tokens, hash and embedding of every QUERY "
+        "knowledge base entry. Embeddings are only stored while KNOWLEDGE_BASE_SCORER "
+        "is \"embedding\"; run with --missing-vectors after switching to it. Also run "
+        "after changing KNOWLEDGE_BASE_STEM_TOKENS or the embedding dimension, or to "
+        "fill in rows written before these columns existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", help="Only backfill this salon's entries")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Entries written per query"
+        )
+        parser.add_argument(
+            "--missing-vectors",
+            action="store_true",
+            help="Only backfill entries without a stored embedding",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        entries = KnowledgeBase.objects.filter(type=KnowledgeBaseTypeOptions.QUERY).only(
+            "id", "type", "question"
+        )
+        if options["tenant"]:
+            entries = entries.filter(tenant=options["tenant"])
+        if options["missing_vectors"]:
+            if not embeddings_enabled():
+                raise CommandError('--missing-vectors needs KNOWLEDGE_BASE_SCORER = "embedding".')
+            entries = entries.filter(embedding__isnull=True)
+
+        updated = 0
+        batch = []
+        for entry in entries.order_by("id").iterator(chunk_size=batch_size):
+            entry.prepare_question()
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                updated += self._write(batch)
+                batch = []
+        if batch:
+            updated += self._write(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} knowledge base questions"))
+
+    def _write(self, batch):
+        # Bumping updated_at lets running servers' freshness checks rebuild their indexes.
+        now = timezone.now()
+        for entry in batch:
+            entry.updated_at = now
+        KnowledgeBase.objects.bulk_update(
+            batch, ["question_normalized", "question_hash", "embedding", "updated_at"]
+        )
+        return len(batch)
@@ -0,0 +1,207 @@
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from src.knowledge_base.benchmark import (
+    build_vocabulary,
+    generate_entries,
+    generate_info_sections,
+    generate_queries,
+    latency_summary,
+)
+from src.knowledge_base.embeddings import embed_question
+from src.knowledge_base.knowledge import KnowledgeBase, get_knowledge_base_registry
+from src.knowledge_base.scorers import SCORERS, create_scorer
+from src.model_helpers import KnowledgeBaseTypeOptions, SourceOptions
+from src.models import KnowledgeBase as KnowledgeBaseModel
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic knowledge bases once measured."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks knowledge base lookups on synthetic salons of each --sizes "
+        "entry count: index build time, single and batch scoring, system "
+        "information loads and the search-query endpoint, for every scorer. "
+        "The synthetic entries are written in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="100,1000,10000", help="Comma separated knowledge base sizes"
+        )
+        parser.add_argument(
+            "--scorers",
+            default=",".join(SCORERS),
+            help=f"Comma separated scorers out of {', '.join(SCORERS)}",
+        )
+        parser.add_argument("--vocabulary", type=int, default=2000, help="Distinct words in questions")
+        parser.add_argument("--queries", type=int, default=300, help="Lookups measured per run")
+        parser.add_argument("--info-sections", type=int, default=6, help="INFO entries per salon")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+        parser.add_argument("--skip-api", action="store_true", help="Do not time the search-query endpoint")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of integers.")
+        scorers = [name for name in options["scorers"].split(",") if name.strip()]
+        unknown = [name for name in scorers if name not in SCORERS]
+        if unknown:
+            raise CommandError(f"Unknown scorers: {', '.join(unknown)}")
+        if not sizes or not scorers or options["queries"] < 1:
+            raise CommandError("Nothing to benchmark.")
+
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "commit": self._git_commit(),
+            "python": platform.python_version(),
+            "config": {
+                key: options[key]
+                for key in ("vocabulary", "queries", "info_sections", "seed", "skip_api")
+            },
+            "results": [],
+        }
+        try:
+            with transaction.atomic():
+                for size in sizes:
+                    tenant = f"benchmark-{size}"
+                    queries = self._generate(tenant, size, options)
+                    for scorer in scorers:
+                        result = self._run(tenant, size, scorer, queries, options)
+                        report["results"].append(result)
+                        self._print(result)
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            registry = get_knowledge_base_registry()
+            for size in sizes:
+                registry.discard(f"benchmark-{size}")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def _generate(self, tenant, size, options):
+        """Write a synthetic salon of `size` QUERY entries and return the queries to time."""
+        rng = random.Random(f"{options['seed']}-{size}")
+        vocabulary = build_vocabulary(options["vocabulary"], rng)
+        entries = generate_entries(size, vocabulary, rng)
+        rows = []
+        for question, answer in entries:
+            row = KnowledgeBaseModel(
+                tenant=tenant,
+                question=question,
+                answer=answer,
+                type=KnowledgeBaseTypeOptions.QUERY,
+                source=SourceOptions.INITIAL,
+                description={},
+            )
+            row.prepare_question()
+            # Stored vectors whatever the configured scorer, so the embedding
+            # build time is measured as it runs in production.
+            row.embedding = row.embedding or embed_question(question)
+            rows.append(row)
+        for key, value in generate_info_sections(options["info_sections"], rng).items():
+            rows.append(
+                KnowledgeBaseModel(
+                    tenant=tenant, answer="", type=KnowledgeBaseTypeOptions.INFO, description={key: value}
+                )
+            )
+        # bulk_create sends no signals, so nothing is queued for after commit.
+        KnowledgeBaseModel.objects.bulk_create(rows, batch_size=1000)
+        return generate_queries(options["queries"], [q for q, _ in entries], vocabulary, rng)
+
+    def _run(self, tenant, size, scorer, queries, options):
+        knowledge_base = KnowledgeBase(tenant)
+        knowledge_base._query_index = create_scorer(scorer)
+
+        started = time.perf_counter()
+        knowledge_base.rebuild_index()
+        build_seconds = time.perf_counter() - started
+
+        lookups = []
+        answered = 0
+        for query in queries:
+            started = time.perf_counter()
+            similar_entries = knowledge_base._find_similar_entries(query)
+            lookups.append(time.perf_counter() - started)
+            answered += bool(similar_entries)
+
+        started = time.perf_counter()
+        knowledge_base.find_similar_entries_batch(queries)
+        batch_seconds = time.perf_counter() - started
+
+        cold_info, warm_info = [], []
+        for _ in range(min(len(queries), 50)):
+            knowledge_base.invalidate_system_information()
+            started = time.perf_counter()
+            knowledge_base.get_system_information()
+            cold_info.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            knowledge_base.get_system_information()
+            warm_info.append(time.perf_counter() - started)
+
+        result = {
+            "entries": size,
+            "scorer": scorer,
+            "build_seconds": round(build_seconds, 4),
+            "memory_bytes": knowledge_base.memory_estimate(),
+            "answered": round(answered / len(queries), 4),
+            "lookup": latency_summary(lookups),
+            "batch": {
+                "queries": len(queries),
+                "seconds": round(batch_seconds, 4),
+                "per_second": round(len(queries) / batch_seconds, 1) if batch_seconds else None,
+            },
+            "system_information_cold": latency_summary(cold_info),
+            "system_information_warm": latency_summary(warm_info),
+        }
+        if not options["skip_api"]:
+            result["search_query_api"] = self._time_api(tenant, knowledge_base, queries)
+        return result
+
+    def _time_api(self, tenant, knowledge_base, queries):
+        """Full DRF round trip of search-query against the warmed knowledge base."""
+        get_knowledge_base_registry().put(tenant, knowledge_base)
+        client = Client(HTTP_HOST="localhost")
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            response = client.get("/api/knowledge-base/search-query/", {"query": query, "tenant": tenant})
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"search-query returned {response.status_code}")
+        return latency_summary(samples)
+
+    def _print(self, result):
+        lookup = result["lookup"]
+        line = (
+            f"{result['entries']:>7} entries {result['scorer']:<10} "
+            f"build {result['build_seconds'] * 1000:.0f} ms, "
+            f"lookup p50 {lookup['p50_ms']:.3f} / p95 {lookup['p95_ms']:.3f} / p99 {lookup['p99_ms']:.3f} ms, "
+            f"batch {result['batch']['per_second']} q/s"
+        )
+        if "search_query_api" in result:
+            line += f", api p95 {result['search_query_api']['p95_ms']:.3f} ms"
+        self.stdout.write(line)
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,133 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from src.model_helpers import KnowledgeBaseTypeOptions, QueryRequestStatusOptions, SourceOptions
+from src.models import DEFAULT_TENANT, ChangeEvent, KnowledgeBase, QueryRequest
+
+
+def hot_queries():
+    """The filters on the request and task hot paths, as (name, queryset)."""
+    now = timezone.now()
+    return [
+        (
+            "expire pending queries (tasks.mark_unresolved_if_expired)",
+            QueryRequest.objects.filter(
+                status=QueryRequestStatusOptions.PENDING, expires_at__lte=now
+            ).order_by("expires_at", "id")[:500],
+        ),
+        (
+            "pending queries page (pending-query)",
+            QueryRequest.objects.filter(status=QueryRequestStatusOptions.PENDING).order_by(
+                "-created_at", "-id"
+            )[:50],
+        ),
+        (
+            "unresolved queries page (get-unresolved-queries)",
+            QueryRequest.objects.filter(status=QueryRequestStatusOptions.UNRESOLVED).order_by(
+                "-created_at", "-id"
+            )[:50],
+        ),
+        (
+            "pending duplicate by hash (query_dedup.find_pending_duplicate)",
+            QueryRequest.objects.filter(
+                tenant=DEFAULT_TENANT,
+                status=QueryRequestStatusOptions.PENDING,
+                question_hash="0123456789abcdef",
+            ).order_by("id"),
+        ),
+        (
+            "all queries page (get-all-queries)",
+            QueryRequest.objects.order_by("-created_at", "-id")[:50],
+        ),
+        (
+            "change feed lookback (changefeed.events_since)",
+            ChangeEvent.objects.filter(id__lte=1000, created_at__gte=now).order_by("-id")[:500],
+        ),
+        (
+            "query entries (KnowledgeBase.rebuild_index)",
+            KnowledgeBase.objects.filter(tenant=DEFAULT_TENANT, type=KnowledgeBaseTypeOptions.QUERY),
+        ),
+        (
+            "tenant rows (knowledge.read_fingerprint)",
+            KnowledgeBase.objects.filter(tenant=DEFAULT_TENANT).only("id", "updated_at"),
+        ),
+        (
+            "info entries (KnowledgeBase.get_system_information)",
+            KnowledgeBase.objects.filter(tenant=DEFAULT_TENANT, type=KnowledgeBaseTypeOptions.INFO),
+        ),
+        (
+            "entry by question (KnowledgeBase.add_or_update_knowledge)",
+            KnowledgeBase.objects.filter(
+                tenant=DEFAULT_TENANT,
+                question="How can I book an appointment?",
+                type=KnowledgeBaseTypeOptions.QUERY,
+            ),
+        ),
+        (
+            "entry by question hash (KnowledgeBase._find_exact_entries)",
+            KnowledgeBase.objects.filter(
+                tenant=DEFAULT_TENANT,
+                type=KnowledgeBaseTypeOptions.QUERY,
+                question_hash="0123456789abcdef",
+            ).order_by("id"),
+        ),
+        (
+            "resolved supervisor answers (KnowledgeBase.get_resolved_queries)",
+            KnowledgeBase.objects.filter(
+                tenant=DEFAULT_TENANT,
+                query_request__status=QueryRequestStatusOptions.RESOLVED,
+                source=SourceOptions.SUPERVISOR,
+            ),
+        ),
+    ]
+
+
+def full_scans(plan: str, vendor: str):
+    """Return the plan lines that read a whole table without an index."""
+    lines = plan.splitlines()
+    if vendor == "sqlite":
+        # e.g. "2 0 216 SCAN src_queryrequest"; "SCAN ... USING INDEX" is an index walk.
+        return [
+            line.strip()
+            for line in lines
+            if " SCAN " in f" {line} " and "USING" not in line
+        ]
+    if vendor == "postgresql":
+        return [line.strip() for line in lines if "Seq Scan" in line]
+    if vendor == "mysql":
+        return [line.strip() for line in lines if "type: ALL" in line or "Table scan" in line]
+    return []
+
+
+class Command(BaseCommand):
+    help = (
+        "Captures EXPLAIN output for every hot query and fails if any of them "
+        "falls back to a full table scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans", action="store_true", help="Print every plan, not just regressions"
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        regressions = []
+
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            scans = full_scans(plan, vendor)
+            if scans:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {name}"))
+            if scans or options["verbose_plans"]:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} hot queries regressed to a full table scan: "
+                + "; ".join(regressions)
+            )
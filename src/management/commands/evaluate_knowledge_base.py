@@ -0,0 +1,69 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from src.knowledge_base.knowledge import get_knowledge_base
+
+
+class Command(BaseCommand):
+    help = (
+        "Scores a JSONL file of queries against the knowledge base in batches. "
+        'Each line is {"query": "...", "expected_id": <optional knowledge base id>}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL file of evaluation queries")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Queries scored per batch"
+        )
+        parser.add_argument("--tenant", help="Salon to evaluate; defaults to DEFAULT_TENANT")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"]) as f:
+                samples = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read evaluation file: {e}")
+
+        if not samples:
+            raise CommandError("Evaluation file is empty.")
+
+        knowledge_base = get_knowledge_base(options["tenant"])
+        batch_size = max(options["batch_size"], 1)
+        answered = labelled = hit_at_1 = hit_at_5 = 0
+        scoring_seconds = 0.0
+
+        for start in range(0, len(samples), batch_size):
+            batch = samples[start : start + batch_size]
+            started = time.perf_counter()
+            results = knowledge_base.find_similar_entries_batch(
+                [sample["query"] for sample in batch]
+            )
+            scoring_seconds += time.perf_counter() - started
+
+            for sample, similar_entries in zip(batch, results):
+                if similar_entries:
+                    answered += 1
+                expected_id = sample.get("expected_id")
+                if expected_id is None:
+                    continue
+                labelled += 1
+                ids = [entry["id"] for entry in similar_entries]
+                if ids[:1] == [str(expected_id)]:
+                    hit_at_1 += 1
+                if str(expected_id) in ids:
+                    hit_at_5 += 1
+
+        total = len(samples)
+        self.stdout.write(f"Queries: {total}, answered: {answered} ({answered / total:.1%})")
+        if labelled:
+            self.stdout.write(
+                f"Labelled: {labelled}, hit@1: {hit_at_1 / labelled:.1%}, "
+                f"hit@5: {hit_at_5 / labelled:.1%}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored in {scoring_seconds * 1000:.2f} ms "
+                f"({total / scoring_seconds if scoring_seconds else 0:.0f} queries/s)"
+            )
+        )
@@ -0,0 +1,66 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from src.knowledge_base.bulk_import import (
+    CSV_FIELDS,
+    DEFAULT_BATCH_SIZE,
+    import_knowledge,
+    iter_records,
+)
+from src.models import DEFAULT_TENANT
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk imports knowledge base entries from a JSONL or CSV file. JSONL lines "
+        'are add-knowledge payloads, e.g. {"question": "...", "answer": "..."} or '
+        '{"type": "info", "description_key": "policies", "description": {"policies": {...}}}. '
+        f"CSV columns are {', '.join(CSV_FIELDS)}, with description as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL or CSV file of knowledge entries")
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="File format; defaults to the file extension",
+        )
+        parser.add_argument(
+            "--tenant", default=DEFAULT_TENANT, help="Salon the entries belong to"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Entries validated and written per transaction",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if file_format not in ("jsonl", "csv"):
+            raise CommandError("Pass --format jsonl or --format csv for this file.")
+
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                report = import_knowledge(
+                    iter_records(f, file_format),
+                    batch_size=max(options["batch_size"], 1),
+                    tenant=options["tenant"],
+                )
+        except OSError as e:
+            raise CommandError(f"Could not read import file: {e}")
+
+        for error in report.errors:
+            self.stdout.write(self.style.WARNING(f"line {error['line']}: {error['error']}"))
+        if report.error_count > len(report.errors):
+            self.stdout.write(
+                self.style.WARNING(f"... {report.error_count - len(report.errors)} more errors")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {report.created}, updated {report.updated}, "
+                f"skipped {report.error_count} invalid entries in {report.elapsed:.2f}s "
+                f"({report.rate:.0f} entries/s)"
+            )
+        )
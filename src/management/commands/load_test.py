@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from src.knowledge_base.benchmark import build_vocabulary, generate_entries, generate_queries
+from src.loadtest import LoadTest, WebhookReceiver
+from src.model_helpers import KnowledgeBaseTypeOptions
+from src.models import DEFAULT_TENANT, KnowledgeBase
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates concurrent voice calls against a running server: search-query "
+        "turns, create-query escalations and supervisor add-knowledge answers, "
+        "as sent by the LiveKit agent. Reports throughput, latency histograms, "
+        "error rates and database lock errors per endpoint. Start the server with "
+        "NOTIFICATION_WEBHOOK_URL pointing at the stand-in receiver to count notifications."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url",
+            default=os.environ.get("CALLAGENT_API_URL", "http://127.0.0.1:8000/api"),
+            help="API root of the server under test",
+        )
+        parser.add_argument("--calls", type=int, default=20, help="Simultaneous calls")
+        parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+        parser.add_argument(
+            "--turn-interval", type=float, default=3.0, help="Mean seconds between turns of a call"
+        )
+        parser.add_argument(
+            "--escalation-rate", type=float, default=0.1, help="Fraction of turns that call create-query"
+        )
+        parser.add_argument(
+            "--answer-interval",
+            type=float,
+            default=5.0,
+            help="Seconds between supervisor answers; 0 disables them",
+        )
+        parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Salon the calls are for")
+        parser.add_argument("--user-id", default="1", help="Caller user id sent with escalations")
+        parser.add_argument("--async-endpoints", action="store_true", help="Use the /api/async/ views")
+        parser.add_argument(
+            "--webhook-port", type=int, default=8799, help="Port of the stand-in webhook receiver; 0 disables it"
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for call behaviour")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options["calls"] < 1 or options["duration"] <= 0 or options["turn_interval"] <= 0:
+            raise CommandError("--calls, --duration and --turn-interval must be positive.")
+
+        questions = self._questions(options["tenant"], options["seed"])
+        receiver = WebhookReceiver(port=options["webhook_port"]) if options["webhook_port"] else None
+        if receiver is not None:
+            self.stdout.write(f"Webhook receiver listening on {receiver.url}")
+        self.stdout.write(
+            f"Running {options['calls']} calls for {options['duration']:.0f}s against {options['base_url']}"
+        )
+
+        load_test = LoadTest(
+            options["base_url"],
+            questions,
+            options["tenant"],
+            user_id=options["user_id"],
+            calls=options["calls"],
+            duration=options["duration"],
+            turn_interval=options["turn_interval"],
+            escalation_rate=options["escalation_rate"],
+            answer_interval=options["answer_interval"],
+            async_endpoints=options["async_endpoints"],
+            seed=options["seed"],
+        )
+        report = asyncio.run(self._run(load_test, receiver))
+        report["config"] = {
+            key: options[key]
+            for key in (
+                "base_url",
+                "calls",
+                "duration",
+                "turn_interval",
+                "escalation_rate",
+                "answer_interval",
+                "tenant",
+                "async_endpoints",
+            )
+        }
+        report["database"] = connection.vendor
+
+        self._print(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    async def _run(self, load_test, receiver):
+        if receiver is not None:
+            await receiver.start()
+        try:
+            report = await load_test.run()
+            if receiver is not None:
+                # Notifications are delivered after commit, often by Celery.
+                await asyncio.sleep(2)
+                report["webhooks"] = receiver.as_dict()
+            return report
+        finally:
+            if receiver is not None:
+                await receiver.stop()
+
+    def _questions(self, tenant, seed):
+        """Caller questions built from the salon's knowledge base, or synthetic ones if it is empty."""
+        rng = random.Random(seed)
+        questions = list(
+            KnowledgeBase.objects.filter(tenant=tenant, type=KnowledgeBaseTypeOptions.QUERY)
+            .exclude(question__isnull=True)
+            .values_list("question", flat=True)[:1000]
+        )
+        if questions:
+            vocabulary = sorted({word for question in questions for word in question.lower().split()})
+        else:
+            self.stdout.write(self.style.WARNING(f"No knowledge entries for {tenant}; using synthetic questions"))
+            vocabulary = build_vocabulary(500, rng)
+            questions = [question for question, _ in generate_entries(200, vocabulary, rng)]
+        return generate_queries(1000, questions, vocabulary, rng)
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{report['elapsed_seconds']}s, {report['calls_completed']} calls completed ({report['database']})"
+        )
+        for name, stats in report["endpoints"].items():
+            latency = stats["latency"]
+            self.stdout.write(
+                f"{name:<14} {stats['requests']:>7} req {stats['per_second']:>8} req/s  "
+                f"p50 {latency.get('p50_ms', 0):.1f} p95 {latency.get('p95_ms', 0):.1f} "
+                f"p99 {latency.get('p99_ms', 0):.1f} ms  errors {stats['error_rate']:.2%} "
+                f"(lock {stats['lock_errors']})"
+            )
+        if "webhooks" in report:
+            webhooks = report["webhooks"]
+            self.stdout.write(
+                f"webhooks       {webhooks['requests']} requests, {webhooks['notifications']} notifications"
+            )
@@ -1,6 +1,5 @@
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from src.models import KnowledgeBase
+from src.knowledge_base.bulk_import import import_knowledge
 from src.model_helpers import SourceOptions, KnowledgeBaseTypeOptions
 
 
@@ -14,7 +13,6 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error importing salon data: {str(e)}"))
 
-    @transaction.atomic
     def import_salon_data(self):
         salon_data = {
             "salon_info": {
@@ -124,79 +122,64 @@ class Command(BaseCommand):
             },
         }
 
-        # Create INFO type entries
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.INFO,
-            description={"salon_info": salon_data["salon_info"]},
-            source=SourceOptions.INITIAL,
-        )
-
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.INFO,
-            description={"services": salon_data["services"]},
-            source=SourceOptions.INITIAL,
-        )
-
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.INFO,
-            description={"staff": salon_data["staff"]},
-            source=SourceOptions.INITIAL,
-        )
+        # INFO type entries
+        records = [
+            {
+                "type": KnowledgeBaseTypeOptions.INFO,
+                "description_key": key,
+                "description": {key: salon_data[key]},
+                "source": SourceOptions.INITIAL,
+            }
+            for key in ("salon_info", "services", "staff", "policies")
+        ]
 
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.INFO,
-            description={"policies": salon_data["policies"]},
-            source=SourceOptions.INITIAL,
-        )
-
-        # Create QUERY type entries (common questions)
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.QUERY,
-            question="What are the salon's working hours?",
-            answer=f"Monday to Friday: {salon_data['salon_info']['working_hours']['monday_to_friday']}, "
-            f"Saturday: {salon_data['salon_info']['working_hours']['saturday']}, "
-            f"Sunday: {salon_data['salon_info']['working_hours']['sunday']}",
-            description={
-                "topic": "working_hours",
-                "data": salon_data["salon_info"]["working_hours"],
+        # Common questions
+        records += [
+            {
+                "question": "What are the salon's working hours?",
+                "answer": f"Monday to Friday: {salon_data['salon_info']['working_hours']['monday_to_friday']}, "
+                f"Saturday: {salon_data['salon_info']['working_hours']['saturday']}, "
+                f"Sunday: {salon_data['salon_info']['working_hours']['sunday']}",
+                "description": {
+                    "topic": "working_hours",
+                    "data": salon_data["salon_info"]["working_hours"],
+                },
+                "source": SourceOptions.INITIAL,
             },
-            source=SourceOptions.INITIAL,
-        )
-
-        # Add more common questions for better coverage
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.QUERY,
-            question="What services do you offer?",
-            answer="We offer various services in categories including Hair, Skin, Nails, and Makeup. "
-            "Our hair services include women's and men's haircuts, coloring, and hair spa treatments. "
-            "For skin, we provide classic and anti-aging facials and eyebrow threading. "
-            "Our nail services include manicures, pedicures, and nail art. "
-            "We also offer party and bridal makeup services.",
-            description={"topic": "services", "data": salon_data["services"]},
-            source=SourceOptions.INITIAL,
-        )
-
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.QUERY,
-            question="What is your cancellation policy?",
-            answer=salon_data["policies"]["cancellation"],
-            description={
-                "topic": "cancellation_policy",
-                "data": salon_data["policies"]["cancellation"],
+            {
+                "question": "What services do you offer?",
+                "answer": "We offer various services in categories including Hair, Skin, Nails, and Makeup. "
+                "Our hair services include women's and men's haircuts, coloring, and hair spa treatments. "
+                "For skin, we provide classic and anti-aging facials and eyebrow threading. "
+                "Our nail services include manicures, pedicures, and nail art. "
+                "We also offer party and bridal makeup services.",
+                "description": {"topic": "services", "data": salon_data["services"]},
+                "source": SourceOptions.INITIAL,
             },
-            source=SourceOptions.INITIAL,
-        )
-
-        KnowledgeBase.objects.create(
-            type=KnowledgeBaseTypeOptions.QUERY,
-            question="How can I book an appointment?",
-            answer=salon_data["policies"]["booking"],
-            description={
-                "topic": "booking_policy",
-                "data": salon_data["policies"]["booking"],
+            {
+                "question": "What is your cancellation policy?",
+                "answer": salon_data["policies"]["cancellation"],
+                "description": {
+                    "topic": "cancellation_policy",
+                    "data": salon_data["policies"]["cancellation"],
+                },
+                "source": SourceOptions.INITIAL,
             },
-            source=SourceOptions.INITIAL,
-        )
+            {
+                "question": "How can I book an appointment?",
+                "answer": salon_data["policies"]["booking"],
+                "description": {
+                    "topic": "booking_policy",
+                    "data": salon_data["policies"]["booking"],
+                },
+                "source": SourceOptions.INITIAL,
+            },
+        ]
+
+        # Upserts, so running the command again refreshes rather than duplicates.
+        report = import_knowledge(enumerate(records, start=1))
+        if report.error_count:
+            raise ValueError(f"Invalid salon data: {report.errors}")
 
         self.stdout.write(
             "Added salon information and common questions to knowledge base"
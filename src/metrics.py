@@ -0,0 +1,322 @@
+# src/metrics.py
+import bisect
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+import logging
+
+logger = logging.getLogger("app_logger")
+
+ENABLED = getattr(settings, "METRICS_ENABLED", True)
+
+# Bucket upper bounds in seconds, for request, search and webhook timings.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """
+    A metric whose updates go to a shard owned by the calling thread, so the
+    hot path takes no lock. Shards are only summed when the metric is read.
+    When a thread goes away its shard is merged into a shared base total, so
+    short-lived request threads do not leave shards behind.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._local = threading.local()
+        self._base: dict = {}
+        self._shards: Dict[int, dict] = {}
+        self._shards_lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards[id(shard)] = shard
+            weakref.finalize(threading.current_thread(), self._retire, shard)
+            return shard
+
+    def _retire(self, shard: dict):
+        # The owning thread is gone, so nothing writes to the shard any more.
+        with self._shards_lock:
+            self._shards.pop(id(shard), None)
+            for labels, value in shard.items():
+                self._base[labels] = self._merge(self._base.get(labels), value)
+
+    def _merge(self, total, value):
+        """Combine two values of one series; never mutates `total`."""
+        raise NotImplementedError
+
+    def _snapshot(self) -> List[dict]:
+        with self._shards_lock:
+            # Copy each shard; its owner may be adding keys while we read.
+            return [dict(self._base)] + [dict(shard) for shard in self._shards.values()]
+
+    def _format_labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        if not ENABLED:
+            return
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def value(self, *labels: str) -> float:
+        return sum(shard.get(labels, 0) for shard in self._snapshot())
+
+    def render(self) -> List[str]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        lines = super().render()
+        for labels, value in sorted(totals.items()):
+            lines.append(f"{self.name}{self._format_labels(labels)} {_number(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labels)
+
+    def observe(self, value: float, *labels: str):
+        if not ENABLED:
+            return
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket counts (plus +Inf), then sum and count.
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def time(self, *labels: str) -> "Timer":
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshot():
+            for labels, series in shard.items():
+                total = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    total[i] += value
+        lines = super().render()
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Timer:
+    """Context manager observing the seconds spent in its block."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+SEARCH_SECONDS = Histogram(
+    "callagent_search_seconds", "Knowledge base search latency.", ["scorer", "mode"]
+)
+SEARCH_CANDIDATES = Histogram(
+    "callagent_search_candidates", "Entries scored per search.", ["scorer"], buckets=COUNT_BUCKETS
+)
+SEARCH_EXACT_HITS = Counter(
+    "callagent_search_exact_hits_total", "Searches answered by the question hash short-circuit.", ["scorer"]
+)
+CACHE_REQUESTS = Counter(
+    "callagent_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "callagent_http_request_seconds", "Request latency by view.", ["view", "method", "status"]
+)
+DB_QUERIES = Histogram(
+    "callagent_db_queries_per_request", "ORM queries run per request.", ["view"], buckets=COUNT_BUCKETS
+)
+WEBHOOK_SECONDS = Histogram("callagent_webhook_seconds", "Notification webhook POST latency.")
+WEBHOOK_FAILURES = Counter("callagent_webhook_failures_total", "Failed notification webhook POSTs.")
+NOTIFICATIONS = Counter("callagent_notifications_total", "Notifications enqueued by type.", ["type"])
+TASK_SECONDS = Histogram("callagent_task_seconds", "Celery task run time.", ["task", "state"])
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run inside it."""
+
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Times every request and counts the ORM queries it runs. Under ASGI the
+    middleware stays async so the async views keep their event loop; their
+    queries run in executor threads and are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        if not ENABLED:
+            return self.get_response(request)
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        view = self._observe(request, response, started)
+        DB_QUERIES.observe(queries.count, view)
+        return response
+
+    async def _acall(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        if ENABLED:
+            self._observe(request, response, started)
+        return response
+
+    def _observe(self, request, response, started: float) -> str:
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, view, request.method, str(response.status_code)
+        )
+        return view
+
+
+def metrics_allowed(address: Optional[str]) -> bool:
+    """Whether a client address may read metrics; see METRICS_ALLOWED_IPS."""
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", ("127.0.0.1", "::1"))
+    return allowed is None or address in allowed
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not metrics_allowed(self.client_address[0]):
+            self.send_error(403)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: Optional[str] = None, attempts: int = 64) -> Optional[int]:
+    """
+    Serve /metrics from a daemon thread, for processes without a Django
+    server such as Celery workers. Binds METRICS_HOST unless `host` is given.
+    Prefork children each take the next free port from `port`. Returns the
+    port, or None if none was free.
+    """
+    host = host or getattr(settings, "METRICS_HOST", "127.0.0.1")
+    for candidate in range(port, port + attempts):
+        try:
+            server = HTTPServer((host, candidate), _MetricsHandler)
+        except OSError:
+            continue
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info(f"Serving metrics on {host}:{candidate}")
+        return candidate
+    logger.warning(f"No free port for the metrics server from {port}")
+    return None
@@ -13,4 +13,9 @@ class QueryRequestStatusOptions(models.TextChoices):
 
 class KnowledgeBaseTypeOptions(models.TextChoices):
     QUERY = 'query', 'Query'
-    INFO = 'info', 'Info'
\ No newline at end of file
+    INFO = 'info', 'Info'
+
+class ChangeEventActionOptions(models.TextChoices):
+    CREATED = 'created', 'Created'
+    UPDATED = 'updated', 'Updated'
+    DELETED = 'deleted', 'Deleted'
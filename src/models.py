@@ -1,7 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 import uuid
 
+from src.knowledge_base.embeddings import embed_question, embeddings_enabled
+from src.knowledge_base.normalize import normalize_question
 from src.model_helpers import (
+    ChangeEventActionOptions,
     KnowledgeBaseTypeOptions,
     QueryRequestStatusOptions,
     SourceOptions,
@@ -21,11 +29,20 @@ class User(models.Model):
         return self.name
 
 
+DEFAULT_TENANT = getattr(settings, "DEFAULT_TENANT", "default")
+
+
+def default_query_expiry():
+    """Pending queries are marked unresolved once QUERY_REQUEST_SLA has passed."""
+    return timezone.now() + timedelta(seconds=getattr(settings, "QUERY_REQUEST_SLA", 2 * 60 * 60))
+
+
 class QueryRequest(models.Model):
     """
     Model representing a query request.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    tenant = models.CharField(max_length=64, default=DEFAULT_TENANT)
     question = models.CharField(max_length=1024)
     status = models.CharField(
         max_length=50,
@@ -34,15 +51,56 @@ class QueryRequest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(default=default_query_expiry)
+    # Hash of the normalized question, for spotting repeats of a pending query.
+    question_hash = models.CharField(max_length=16, blank=True, default="", editable=False)
+    # Callers attached to this query as QueryFollowers instead of opening their own.
+    follower_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Dashboard listings: filter on status, newest first.
+            models.Index(fields=["status", "created_at", "id"], name="queryrequest_status_created"),
+            # Unfiltered newest-first listing.
+            models.Index(fields=["created_at", "id"], name="queryrequest_created"),
+            # Expiry sweep: pending rows by deadline. A partial pending-only index
+            # is not used by SQLite because the status arrives as a bound parameter.
+            models.Index(fields=["status", "expires_at", "id"], name="queryrequest_status_expires"),
+            # create-query looks for a pending query with the same question.
+            models.Index(
+                fields=["tenant", "status", "question_hash"], name="queryrequest_pending_hash"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        _, self.question_hash = normalize_question(self.question)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.question[:50]
 
 
+class QueryFollower(models.Model):
+    """
+    Model representing a caller whose question was coalesced into an existing
+    pending query request. Followers are notified when that query is answered.
+    """
+    query_request = models.ForeignKey(
+        QueryRequest, on_delete=models.CASCADE, related_name="followers"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    question = models.CharField(max_length=1024)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.query_request_id}"
+
+
 class KnowledgeBase(models.Model):
     """
     Model representing a knowledge base.
     """
+    tenant = models.CharField(max_length=64, default=DEFAULT_TENANT)
     question = models.CharField(blank=True, null=True, max_length=1024)
     answer = models.TextField()
     type = models.CharField(
@@ -57,18 +115,125 @@ class KnowledgeBase(models.Model):
     query_request = models.ForeignKey(
         QueryRequest, on_delete=models.CASCADE, blank=True, null=True
     )
+    # Derived from the question on save; see prepare_question().
+    question_normalized = models.TextField(blank=True, default="", editable=False)
+    question_hash = models.CharField(max_length=16, blank=True, default="", editable=False)
+    embedding = models.BinaryField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Index rebuilds and system information load by tenant and type.
+            models.Index(fields=["tenant", "type"], name="knowledgebase_tenant_type"),
+            # add_or_update_knowledge looks entries up by (tenant, question, type).
+            models.Index(
+                fields=["tenant", "question", "type"], name="knowledgebase_tenant_question"
+            ),
+            # Exact question lookups by normalized hash.
+            models.Index(
+                fields=["tenant", "type", "question_hash"], name="knowledgebase_question_hash"
+            ),
+            # get_resolved_queries filters supervisor answers joined to their query.
+            models.Index(fields=["source", "query_request"], name="knowledgebase_source_query"),
+        ]
 
     def save(self, *args, **kwargs):
         """
         Override the save method to set the source to INITIAL if not provided.
         """
-        if not self.question or not self.answer and self.type != KnowledgeBaseTypeOptions.INFO:
+        if self.type != KnowledgeBaseTypeOptions.INFO and (not self.question or not self.answer):
             raise ValueError("Question must be provided for query type.")
         
         if self.query_request and self.query_request.status != QueryRequestStatusOptions.RESOLVED:
             raise ValueError("Only resolved query requests can be linked to knowledge base entries.")
 
+        self.prepare_question()
+        self.answer_changed = self._state.adding or (
+            self._answer_state() != getattr(self, "_loaded_answer", None)
+        )
         super().save(*args, **kwargs)
+        self._loaded_answer = self._answer_state()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell whether the answer was changed.
+        instance._loaded_answer = instance._answer_state()
+        return instance
+
+    def _answer_state(self):
+        return tuple(self.__dict__.get(name) for name in ("question", "answer", "source"))
+
+    def prepare_question(self):
+        """
+        Fill the normalized token, hash and embedding columns from the question,
+        so searches start from ready-made values. The embedding is only computed
+        when the embedding scorer is configured; backfill_questions fills it in
+        after switching. Called by save(); bulk writes must call it themselves.
+        """
+        if self.type != KnowledgeBaseTypeOptions.QUERY or not self.question:
+            # Nothing to search by; drop values left from an earlier question.
+            self.question_normalized = ""
+            self.question_hash = ""
+            self.embedding = None
+            return
+        tokens, digest = normalize_question(self.question)
+        self.question_normalized = " ".join(tokens)
+        self.question_hash = digest
+        self.embedding = embed_question(self.question) if embeddings_enabled() else None
+
+
+class NotificationDeadLetter(models.Model):
+    """
+    Model representing a notification that could not be delivered after all retries.
+    """
+    destination = models.CharField(max_length=1024)
+    payload = models.JSONField()
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.destination} ({self.attempts} attempts)"
+
+
+class NotificationLogEntry(models.Model):
+    """
+    Model representing a notification in the persistent, append-only notification log.
+    """
+    type = models.CharField(max_length=50)
+    customer_id = models.CharField(max_length=255, blank=True)
+    request_id = models.CharField(max_length=255, blank=True)
+    payload = models.JSONField()
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["customer_id", "sent_at"]),
+            models.Index(fields=["sent_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.type} @ {self.sent_at}"
+
+
+class ChangeEvent(models.Model):
+    """
+    Model representing one write to a QueryRequest or KnowledgeBase row. The
+    auto-incrementing id is the feed sequence number clients resume from.
+    """
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=20, choices=ChangeEventActionOptions.choices)
+    data = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # events_since's lookback window and the prune task's cut-off.
+            models.Index(fields=["created_at"], name="changeevent_created_at"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.model} {self.object_id} {self.action}"
@@ -0,0 +1,145 @@
+# notification/dispatch.py
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from requests.adapters import HTTPAdapter
+from src.metrics import NOTIFICATIONS, WEBHOOK_FAILURES, WEBHOOK_SECONDS
+import logging
+
+logger = logging.getLogger("app_logger")
+
+WEBHOOK_TIMEOUT = getattr(settings, "NOTIFICATION_WEBHOOK_TIMEOUT", 5)
+BATCH_SIZE = getattr(settings, "NOTIFICATION_BATCH_SIZE", 50)
+MAX_RETRIES = getattr(settings, "NOTIFICATION_MAX_RETRIES", 5)
+RETRY_BACKOFF = getattr(settings, "NOTIFICATION_RETRY_BACKOFF", 2)
+
+_local = threading.local()
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session so webhook deliveries reuse pooled connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def send_batch(destination: str, payloads: List[Dict[str, Any]]):
+    """
+    POST notifications to one destination. A single notification is sent as is;
+    several are wrapped in one notification_batch request. Raises on failure.
+    """
+    if len(payloads) == 1:
+        body = payloads[0]
+    else:
+        body = {"type": "notification_batch", "notifications": payloads}
+    logger.info(f"Sending {len(payloads)} notification(s) to {destination}")
+    try:
+        with WEBHOOK_SECONDS.time():
+            response = get_session().post(destination, json=body, timeout=WEBHOOK_TIMEOUT)
+        response.raise_for_status()
+    except Exception:
+        WEBHOOK_FAILURES.inc()
+        raise
+
+
+def record_dead_letters(destination: str, payloads: List[Dict[str, Any]], error: str, attempts: int):
+    """Keep notifications that could not be delivered for inspection and replay."""
+    from src.models import NotificationDeadLetter
+
+    NotificationDeadLetter.objects.bulk_create(
+        [
+            NotificationDeadLetter(
+                destination=destination, payload=payload, error=error, attempts=attempts
+            )
+            for payload in payloads
+        ]
+    )
+    logger.error(f"Dead-lettered {len(payloads)} notification(s) for {destination}: {error}")
+
+
+@contextmanager
+def batch_notifications():
+    """
+    Collect every notification enqueued inside the block and dispatch them,
+    grouped per destination, once the surrounding transaction commits. If the
+    block raises, the collected notifications are dropped.
+    """
+    outer = getattr(_local, "pending", None)
+    if outer is not None:
+        # Nested blocks join the outermost batch.
+        yield
+        return
+
+    _local.pending = pending = defaultdict(list)
+    try:
+        yield
+    finally:
+        _local.pending = None
+    if pending:
+        transaction.on_commit(lambda: _dispatch(pending))
+
+
+def enqueue_notification(destination: str, payload: Dict[str, Any]):
+    """Hand a notification to the dispatch queue; it is sent after commit."""
+    NOTIFICATIONS.inc(payload.get("type", "unknown"))
+    pending = getattr(_local, "pending", None)
+    if pending is not None:
+        pending[destination].append(payload)
+    else:
+        transaction.on_commit(lambda: _dispatch({destination: [payload]}))
+
+
+def _dispatch(pending: Dict[str, List[Dict[str, Any]]]):
+    from src.tasks import deliver_notifications
+
+    for destination, payloads in pending.items():
+        for start in range(0, len(payloads), BATCH_SIZE):
+            chunk = payloads[start : start + BATCH_SIZE]
+            try:
+                # Fail fast when the broker is down rather than holding the
+                # response while kombu retries the publish.
+                deliver_notifications.apply_async(args=(destination, chunk), retry=False)
+            except Exception as e:
+                # Broker unavailable: deliver from a local thread instead so
+                # the request still does not wait on the webhook.
+                logger.error(f"Could not queue notifications, delivering locally: {e}")
+                threading.Thread(
+                    target=_deliver_locally, args=(destination, chunk), daemon=True
+                ).start()
+
+
+def _deliver_locally(destination: str, payloads: List[Dict[str, Any]]):
+    """
+    Fallback for deliver_notifications when the broker is down: the same
+    retry budget and exponential backoff, slept out in this thread.
+    """
+    from django.db import connection
+
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                send_batch(destination, payloads)
+                return
+            except Exception as e:
+                if attempt >= MAX_RETRIES:
+                    record_dead_letters(destination, payloads, str(e), attempts=attempt + 1)
+                    return
+                logger.warning(f"Webhook delivery to {destination} failed ({e}), retrying locally.")
+                time.sleep(RETRY_BACKOFF * (2 ** attempt))
+    finally:
+        connection.close()
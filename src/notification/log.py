@@ -0,0 +1,137 @@
+# notification/log.py
+import atexit
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger("app_logger")
+
+RECENT_CAPACITY = getattr(settings, "NOTIFICATION_LOG_CAPACITY", 1000)
+FLUSH_SIZE = getattr(settings, "NOTIFICATION_LOG_FLUSH_SIZE", 100)
+FLUSH_INTERVAL = getattr(settings, "NOTIFICATION_LOG_FLUSH_INTERVAL", 5)
+
+
+class NotificationRecord:
+    """
+    One sent notification, kept compact for the in-memory log: the payload
+    fields are held in slots rather than the payload dict itself, and
+    as_dict() rebuilds the payload from them. Fields that are None are left
+    out of the rebuilt payload.
+    """
+
+    FIELDS = ("type", "customer_id", "request_id", "email", "question", "message", "timestamp")
+
+    __slots__ = FIELDS + ("sent_at",)
+
+    def __init__(self, data: Dict[str, Any]):
+        for field in self.FIELDS:
+            setattr(self, field, data.get(field))
+        self.sent_at = timezone.now()
+
+    def as_dict(self) -> Dict[str, Any]:
+        values = ((field, getattr(self, field)) for field in self.FIELDS)
+        return {field: value for field, value in values if value is not None}
+
+
+class NotificationLog:
+    """Fixed-capacity ring buffer of the most recent notifications in this process."""
+
+    def __init__(self, capacity: int = RECENT_CAPACITY):
+        self._records: "deque[NotificationRecord]" = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def append(self, record: NotificationRecord):
+        self._records.append(record)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return up to `limit` of the newest notifications, oldest first."""
+        records = list(self._records)
+        if limit is not None:
+            records = records[-limit:]
+        return [record.as_dict() for record in records]
+
+
+class NotificationSink:
+    """
+    Append-only persistent notification log. Records are buffered once their
+    transaction commits and written with one bulk insert per FLUSH_SIZE
+    records or FLUSH_INTERVAL seconds, whichever comes first.
+    """
+
+    def __init__(self, flush_size: int = FLUSH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: List[NotificationRecord] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def append(self, record: NotificationRecord):
+        transaction.on_commit(lambda: self._buffer_record(record))
+
+    def flush(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not records:
+            return
+
+        from src.models import NotificationLogEntry
+
+        try:
+            NotificationLogEntry.objects.bulk_create(
+                [
+                    NotificationLogEntry(
+                        type=record.type,
+                        customer_id=str(record.customer_id or ""),
+                        request_id=str(record.request_id or ""),
+                        payload=record.as_dict(),
+                        sent_at=record.sent_at,
+                    )
+                    for record in records
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Error persisting {len(records)} notification log records: {e}")
+
+    def _buffer_record(self, record: NotificationRecord):
+        with self._lock:
+            self._buffer.append(record)
+            due = len(self._buffer) >= self.flush_size
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_on_timer(self):
+        from django.db import connection
+
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+recent_notifications = NotificationLog()
+notification_sink = NotificationSink()
+atexit.register(notification_sink.flush)
+
+
+def record_notification(data: Dict[str, Any]):
+    """Add a notification to the in-memory log and the persistent sink."""
+    record = NotificationRecord(data)
+    recent_notifications.append(record)
+    notification_sink.append(record)
@@ -1,8 +1,9 @@
-import requests
 import json
 import os
 from typing import Optional, Dict, Any
 from datetime import datetime
+from src.notification.dispatch import enqueue_notification
+from src.notification.log import record_notification, recent_notifications
 import logging
 logger = logging.getLogger("app_logger")
 
@@ -13,10 +14,12 @@ class Notifier:
         """Initialize with optional webhook URL."""
         self.webhook_url = webhook_url or os.environ.get("NOTIFICATION_WEBHOOK_URL")
         logger.info(f"Webhook URL: {self.webhook_url}")
-        self.notification_log = []
 
     def notify_supervisor(self, request_id: str, message: str):
         """Notify a supervisor about a help request."""
+        self._send_webhook(self._supervisor_notification(request_id, message))
+
+    def _supervisor_notification(self, request_id: str, message: str) -> Dict[str, Any]:
         notification = {
             "type": "supervisor_notification",
             "request_id": request_id,
@@ -24,15 +27,19 @@ class Notifier:
             "timestamp": datetime.now().isoformat(),
         }
 
-        self.notification_log.append(notification)
+        record_notification(notification)
 
         logger.info(f"\n[SUPERVISOR NOTIFICATION] Request ID: {request_id}")
         logger.info(f"Message: {message}")
-
-        self._send_webhook(notification)
+        return notification
 
     def notify_customer(self, customer_id: str, email: str,message: str,question:str=''):
         """Notify a customer with a response."""
+        self._send_webhook(self._customer_notification(customer_id, email, message, question))
+
+    def _customer_notification(
+        self, customer_id: str, email: str, message: str, question: str
+    ) -> Dict[str, Any]:
         notification = {
             "type": "customer_notification",
             "customer_id": customer_id,
@@ -42,32 +49,59 @@ class Notifier:
             "timestamp": datetime.now().isoformat(),
         }
 
-        self.notification_log.append(notification)
+        record_notification(notification)
 
         logger.info(f"\n[CUSTOMER NOTIFICATION] Customer ID: {customer_id}")
         logger.info(f"Message: {message}")
-        
-        self._send_webhook(notification)
+        return notification
+
+    def notify_query_unresolved(self, customer_id: str, email: str, request_id: str, question: str):
+        """Tell a customer their query expired before a supervisor could answer it."""
+        self._send_webhook(self._unresolved_notification(customer_id, email, request_id, question))
+
+    def _unresolved_notification(
+        self, customer_id: str, email: str, request_id: str, question: str
+    ) -> Dict[str, Any]:
+        notification = {
+            "type": "query_unresolved",
+            "customer_id": customer_id,
+            "email": email,
+            "request_id": request_id,
+            "question": question,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+        record_notification(notification)
+
+        logger.info(f"\n[UNRESOLVED NOTIFICATION] Customer ID: {customer_id} Request ID: {request_id}")
+        return notification
 
     def _send_webhook(self, data: Dict[str, Any]):
-        """Send data to webhook URL if available."""
+        """Queue data for the webhook URL if available; it is delivered after commit."""
         if not self.webhook_url:
             return
 
-        try:
-            logger.info(f"Sending webhook to {self.webhook_url} with data: {data}")
-            headers = {"Content-Type": "application/json"}
-            response = requests.post(
-                self.webhook_url, headers=headers, json=data
-            )
+        enqueue_notification(self.webhook_url, data)
 
-            if response.status_code >= 400:
-                logger.info(f"Webhook error: {response.status_code} - {response.text}")
+    def get_notification_log(self, limit: Optional[int] = None):
+        """Get the most recent notifications sent by this process for debugging and monitoring."""
+        return recent_notifications.recent(limit)
 
-            logger.info("Webhook sent successfully. Response:", response.status_code)
-        except Exception as e:
-            logger.error(f"Error sending webhook notification: {e}")
+    def query_notification_log(
+        self,
+        customer_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+    ):
+        """Query the persistent notification log, newest first."""
+        from src.models import NotificationLogEntry
 
-    def get_notification_log(self):
-        """Get the notification log for debugging and monitoring."""
-        return self.notification_log
+        entries = NotificationLogEntry.objects.all()
+        if customer_id is not None:
+            entries = entries.filter(customer_id=str(customer_id))
+        if since is not None:
+            entries = entries.filter(sent_at__gte=since)
+        if until is not None:
+            entries = entries.filter(sent_at__lt=until)
+        return list(entries.order_by("-sent_at").values_list("payload", flat=True)[:limit])
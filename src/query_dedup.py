@@ -0,0 +1,221 @@
+# src/query_dedup.py
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from src.changefeed import TRACKED_MODELS, record_bulk_changes
+from src.knowledge_base.index import InvertedIndex
+from src.knowledge_base.normalize import is_near_duplicate, normalize_question
+from src.model_helpers import ChangeEventActionOptions, QueryRequestStatusOptions
+from src.models import KnowledgeBase, QueryFollower, QueryRequest
+from src.notification.dispatch import batch_notifications
+from src.notification.notifier import Notifier
+import logging
+
+logger = logging.getLogger("app_logger")
+
+
+class PendingQuestionIndex:
+    """
+    Per-tenant word-overlap index over pending query questions, used to spot a
+    new escalation that repeats one already waiting for a supervisor. Writes
+    made by this process are applied after commit; writes from other processes
+    are picked up when a tenant's index is reloaded after `ttl` seconds.
+    Candidates are always re-checked against the database before use.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else getattr(settings, "QUERY_DEDUP_INDEX_TTL", 60)
+        self._indexes: Dict[str, Tuple[float, InvertedIndex]] = {}
+        self._lock = threading.Lock()
+
+    def candidates(
+        self,
+        tenant: str,
+        question: str,
+        threshold: float,
+        limit: int = 5,
+    ) -> List[int]:
+        """Ids of pending queries whose question scores above `threshold`, best first."""
+        index = self._get_index(tenant, self.ttl)
+        return [int(result["id"]) for result in index.search(question, limit=limit, threshold=threshold)]
+
+    def sync(self, query_request: QueryRequest):
+        """Reflect a saved query in its tenant's index, if loaded."""
+        loaded = self._indexes.get(query_request.tenant)
+        if loaded is None:
+            return
+        _, index = loaded
+        if query_request.status == QueryRequestStatusOptions.PENDING:
+            index.upsert(query_request.id, query_request.question, "")
+        else:
+            index.remove(query_request.id)
+
+    def remove(self, tenant: str, *query_ids: int):
+        loaded = self._indexes.get(tenant)
+        if loaded is not None:
+            for query_id in query_ids:
+                loaded[1].remove(query_id)
+
+    def _get_index(self, tenant: str, ttl: float) -> InvertedIndex:
+        loaded = self._indexes.get(tenant)
+        if loaded is not None and time.monotonic() - loaded[0] < ttl:
+            return loaded[1]
+        with self._lock:
+            loaded = self._indexes.get(tenant)
+            if loaded is not None and time.monotonic() - loaded[0] < ttl:
+                return loaded[1]
+            index = InvertedIndex()
+            rows = QueryRequest.objects.filter(
+                tenant=tenant, status=QueryRequestStatusOptions.PENDING
+            ).values_list("id", "question")
+            index.build((query_id, question, "") for query_id, question in rows.iterator())
+            self._indexes[tenant] = (time.monotonic(), index)
+            return index
+
+
+_pending_index = PendingQuestionIndex()
+
+
+def get_pending_index() -> PendingQuestionIndex:
+    return _pending_index
+
+
+def find_pending_duplicate(tenant: str, question: str) -> Optional[QueryRequest]:
+    """
+    Return the pending query of the tenant that `question` repeats, locked for
+    update, or None. Repeats are questions with the same normalized hash. With
+    QUERY_DEDUP_NEAR_MATCHES set, questions differing by a single stopword
+    (see is_near_duplicate) are found through the pending question index too.
+    """
+    tokens, digest = normalize_question(question)
+    if not tokens:
+        return None
+    pending = QueryRequest.objects.select_for_update().filter(
+        tenant=tenant, status=QueryRequestStatusOptions.PENDING
+    )
+    canonical = pending.filter(question_hash=digest).order_by("id").first()
+    if canonical is not None or not getattr(settings, "QUERY_DEDUP_NEAR_MATCHES", False):
+        return canonical
+
+    # A one-token swap between equal sized sets scores (n - 1) / (n + 1).
+    threshold = max((len(tokens) - 1) / (len(tokens) + 1) - 1e-9, 0.0)
+    for query_id in get_pending_index().candidates(tenant, question, threshold):
+        # The index may lag behind other processes; trust only what is still pending.
+        canonical = pending.filter(id=query_id).first()
+        if canonical is not None and is_near_duplicate(tokens, normalize_question(canonical.question)[0]):
+            return canonical
+    return None
+
+
+@transaction.atomic
+def create_or_attach_query(
+    user, question: str, tenant: str, expiry: Dict[str, Any], dedupe: bool = True
+) -> Tuple[QueryRequest, bool]:
+    """
+    Open a query request, or attach the caller to a pending one asking the
+    same thing. Returns the query and whether it was newly created.
+    """
+    if dedupe and getattr(settings, "QUERY_DEDUP_ENABLED", True):
+        canonical = find_pending_duplicate(tenant, question)
+        if canonical is not None:
+            _attach_follower(canonical, user, question, expiry)
+            return canonical, False
+    query_request = QueryRequest.objects.create(user=user, question=question, tenant=tenant, **expiry)
+    return query_request, True
+
+
+def _attach_follower(canonical: QueryRequest, user, question: str, expiry: Dict[str, Any]):
+    update_fields = ["updated_at"]
+    already_waiting = (
+        canonical.user_id == user.id
+        or QueryFollower.objects.filter(query_request=canonical, user=user).exists()
+    )
+    if not already_waiting:
+        QueryFollower.objects.create(query_request=canonical, user=user, question=question)
+        canonical.follower_count += 1
+        update_fields.append("follower_count")
+
+    expires_at = expiry.get("expires_at")
+    if expires_at is not None and expires_at < canonical.expires_at:
+        # The tightest deadline among the askers applies to all of them.
+        from src.tasks import schedule_query_expiry
+
+        canonical.expires_at = expires_at
+        update_fields.append("expires_at")
+        schedule_query_expiry(canonical.id, expires_at)
+
+    canonical.save(update_fields=update_fields)
+    logger.info(
+        f"Coalesced question from user {user.id} into query {canonical.id} "
+        f"({canonical.follower_count} followers)"
+    )
+
+
+def notify_query_answered(
+    query_request: QueryRequest, answer: str, question: str, notifier: Optional[Notifier] = None
+):
+    """
+    Send a supervisor's answer to the query's caller and every follower, as
+    one batch per webhook destination once the transaction commits.
+    """
+    notifier = notifier or Notifier()
+    followers = QueryFollower.objects.filter(query_request=query_request).values_list(
+        "user_id", "user__email", "question"
+    )
+    with batch_notifications():
+        user = query_request.user
+        notifier.notify_customer(user.id, user.email, answer, question)
+        for user_id, email, follower_question in followers:
+            notifier.notify_customer(user_id, email, answer, follower_question)
+
+
+@transaction.atomic
+def resolve_matching_queries(entry: KnowledgeBase, notifier: Optional[Notifier] = None) -> int:
+    """
+    Resolve every pending query of the entry's tenant that asks the entry's
+    question, i.e. has the same normalized question hash. Callers and
+    followers get the answer in one notification batch. Returns the number of
+    queries resolved.
+    """
+    tokens, digest = normalize_question(entry.question or "")
+    if not tokens:
+        return 0
+    limit = getattr(settings, "QUERY_AUTO_RESOLVE_LIMIT", 500)
+
+    # Served by the (tenant, status, question_hash) index; no in-memory reload.
+    pending = QueryRequest.objects.filter(tenant=entry.tenant, status=QueryRequestStatusOptions.PENDING)
+    matched = list(pending.filter(question_hash=digest).order_by("id").values_list("id", flat=True)[:limit])
+    if not matched:
+        return 0
+
+    now = timezone.now()
+    claimed = list(
+        pending.filter(id__in=matched).select_for_update(skip_locked=True).values_list("id", flat=True)
+    )
+    pending.filter(id__in=claimed).update(status=QueryRequestStatusOptions.RESOLVED, updated_at=now)
+    rows = list(
+        QueryRequest.objects.filter(id__in=claimed).values(*TRACKED_MODELS[QueryRequest][1], "user__email")
+    )
+    followers = QueryFollower.objects.filter(query_request_id__in=claimed).values_list(
+        "user_id", "user__email", "question"
+    )
+
+    notifier = notifier or Notifier()
+    with batch_notifications():
+        for row in rows:
+            notifier.notify_customer(row["user_id"], row.pop("user__email"), entry.answer, row["question"])
+        for user_id, email, question in followers:
+            notifier.notify_customer(user_id, email, entry.answer, question)
+    # Bulk updates send no signals, so feed the dashboard and index explicitly.
+    record_bulk_changes(QueryRequest, rows, ChangeEventActionOptions.UPDATED)
+    transaction.on_commit(lambda: get_pending_index().remove(entry.tenant, *claimed))
+
+    logger.info(
+        f"Knowledge entry {entry.id} resolved {len(rows)} pending queries "
+        f"for tenant {entry.tenant}"
+    )
+    return len(rows)
@@ -0,0 +1,7 @@
+# WebSocket routes served by the Channels ProtocolTypeRouter in CallAgent/asgi.py
+from django.urls import path
+from src.consumers import DashboardConsumer
+
+websocket_urlpatterns = [
+    path("ws/dashboard/", DashboardConsumer.as_asgi()),
+]
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from src.changefeed import record_change
+from src.knowledge_base.knowledge import get_loaded_knowledge_base
+from src.model_helpers import (
+    ChangeEventActionOptions,
+    KnowledgeBaseTypeOptions,
+    QueryRequestStatusOptions,
+    SourceOptions,
+)
+from src.models import KnowledgeBase as KnowledgeBaseModel, QueryRequest
+from src.query_dedup import get_pending_index
+from src.tasks import schedule_answer_fanout, schedule_query_expiry
+
+
+@receiver(post_save, sender=KnowledgeBaseModel)
+def knowledge_saved(sender, instance, created, **kwargs):
+    """
+    Refresh in-memory knowledge structures once the write is committed, and
+    let a new or changed supervisor answer resolve other pending queries
+    asking the same.
+    """
+
+    def refresh():
+        # Tenants this process has not loaded pick the write up when they load.
+        knowledge_base = get_loaded_knowledge_base(instance.tenant)
+        if knowledge_base is None:
+            return
+        knowledge_base.sync_entry(instance, created=created)
+        knowledge_base.invalidate_system_information()
+
+    transaction.on_commit(refresh)
+    if (
+        instance.source == SourceOptions.SUPERVISOR
+        and instance.type == KnowledgeBaseTypeOptions.QUERY
+        and instance.answer_changed
+        and getattr(settings, "QUERY_AUTO_RESOLVE_ENABLED", True)
+    ):
+        schedule_answer_fanout(instance.id)
+    record_change(
+        instance,
+        ChangeEventActionOptions.CREATED if created else ChangeEventActionOptions.UPDATED,
+    )
+
+
+@receiver(post_delete, sender=KnowledgeBaseModel)
+def knowledge_deleted(sender, instance, **kwargs):
+    """Drop a deleted entry from in-memory knowledge structures after commit."""
+    entry_id = instance.id
+    tenant = instance.tenant
+
+    def refresh():
+        knowledge_base = get_loaded_knowledge_base(tenant)
+        if knowledge_base is None:
+            return
+        knowledge_base.remove_entry(entry_id)
+        knowledge_base.invalidate_system_information()
+
+    transaction.on_commit(refresh)
+    record_change(instance, ChangeEventActionOptions.DELETED)
+
+
+@receiver(post_save, sender=QueryRequest)
+def query_request_saved(sender, instance, created, **kwargs):
+    """
+    Append the write to the dashboard change feed, schedule a new query's
+    deadline and keep the pending question index current.
+    """
+    if created and instance.status == QueryRequestStatusOptions.PENDING:
+        schedule_query_expiry(instance.id, instance.expires_at)
+    transaction.on_commit(lambda: get_pending_index().sync(instance))
+    record_change(
+        instance,
+        ChangeEventActionOptions.CREATED if created else ChangeEventActionOptions.UPDATED,
+    )
+
+
+@receiver(post_delete, sender=QueryRequest)
+def query_request_deleted(sender, instance, **kwargs):
+    """Append the deletion to the dashboard change feed."""
+    query_id = instance.id
+    tenant = instance.tenant
+    transaction.on_commit(lambda: get_pending_index().remove(tenant, query_id))
+    record_change(instance, ChangeEventActionOptions.DELETED)
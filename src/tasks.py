@@ -1,19 +1,224 @@
 # src/tasks.py
 
 from celery import shared_task
-from datetime import timedelta
+from django.conf import settings
+from celery.signals import task_postrun, task_prerun, worker_process_init
+from django.db import transaction
 from django.utils import timezone
-from .models import QueryRequest, QueryRequestStatusOptions
+from .changefeed import TRACKED_MODELS, prune_events, record_bulk_changes
+from .knowledge_base.knowledge import get_knowledge_base
+from .metrics import TASK_SECONDS, start_metrics_server
+from .model_helpers import ChangeEventActionOptions
+from .models import KnowledgeBase, QueryFollower, QueryRequest, QueryRequestStatusOptions
+from .notification.dispatch import batch_notifications, record_dead_letters, send_batch
+from .notification.notifier import Notifier
+from .query_dedup import resolve_matching_queries
 import logging
+import time
+from datetime import timedelta
 logger = logging.getLogger(__name__)
 
+def expire_query_batch(now, batch_size, notifier=None):
+    """
+    Mark one bounded batch of pending queries past their deadline as unresolved,
+    in its own short transaction. Customers get one batched notification per
+    batch. Returns the number of rows claimed; zero means nothing is left.
+    """
+    with transaction.atomic(), batch_notifications():
+        expired_ids = list(
+            QueryRequest.objects.filter(status=QueryRequestStatusOptions.PENDING, expires_at__lte=now)
+            .order_by('expires_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        _mark_unresolved(expired_ids, now, notifier or Notifier())
+    return len(expired_ids)
+
+
+def _mark_unresolved(expired_ids, now, notifier):
+    """Update claimed pending queries, notify their customers and record change events."""
+    if not expired_ids:
+        return
+    QueryRequest.objects.filter(
+        id__in=expired_ids, status=QueryRequestStatusOptions.PENDING
+    ).update(status=QueryRequestStatusOptions.UNRESOLVED, updated_at=now)
+
+    rows = list(
+        QueryRequest.objects.filter(
+            id__in=expired_ids, status=QueryRequestStatusOptions.UNRESOLVED, updated_at=now
+        ).values(*TRACKED_MODELS[QueryRequest][1], 'user__email')
+    )
+    for row in rows:
+        notifier.notify_query_unresolved(
+            row['user_id'], row.pop('user__email'), row['id'], row['question']
+        )
+    followers = QueryFollower.objects.filter(
+        query_request_id__in=[row['id'] for row in rows]
+    ).values_list('user_id', 'user__email', 'query_request_id', 'question')
+    for user_id, email, query_id, question in followers:
+        notifier.notify_query_unresolved(user_id, email, query_id, question)
+    # Bulk updates send no signals, so feed the dashboard explicitly.
+    record_bulk_changes(QueryRequest, rows, ChangeEventActionOptions.UPDATED)
+
+
+@shared_task
+def expire_query(query_id):
+    """
+    Deadline task scheduled for each new query. A no-op if the query was
+    answered in time, so redelivery or a racing sweep is harmless.
+    """
+    now = timezone.now()
+    with transaction.atomic(), batch_notifications():
+        expired_ids = list(
+            QueryRequest.objects.filter(
+                id=query_id, status=QueryRequestStatusOptions.PENDING, expires_at__lte=now
+            )
+            .select_for_update()
+            .values_list('id', flat=True)
+        )
+        _mark_unresolved(expired_ids, now, Notifier())
+    return f'Expired query {query_id}.' if expired_ids else f'Query {query_id} not expired.'
+
+
+def schedule_query_expiry(query_id, expires_at):
+    """
+    Register a query's deadline with the broker once its row is committed.
+    Deadlines further out than QUERY_EXPIRY_MAX_ETA are left to the
+    reconciliation sweep: Redis redelivers unacknowledged ETA tasks after the
+    broker visibility timeout, so a longer ETA would be handed out repeatedly.
+    """
+    max_eta = getattr(settings, 'QUERY_EXPIRY_MAX_ETA', 6 * 60 * 60)
+    if expires_at - timezone.now() > timedelta(seconds=max_eta):
+        return
+
+    def schedule():
+        # retry=False: with the broker down, fail fast rather than hold up the request.
+        try:
+            expire_query.apply_async(args=[query_id], eta=expires_at, retry=False)
+        except Exception as e:
+            # The reconciliation sweep picks the query up instead.
+            logger.warning(f'Could not schedule expiry for query {query_id}: {e}')
+
+    transaction.on_commit(schedule)
+
+
+@shared_task
+def resolve_queries_answered_by(entry_id):
+    """
+    Fan a new supervisor answer out to every pending query asking the same
+    question, so each does not wait for its own answer or expiry.
+    """
+    entry = KnowledgeBase.objects.filter(id=entry_id).first()
+    if entry is None:
+        return f'Knowledge entry {entry_id} no longer exists.'
+    resolved = resolve_matching_queries(entry)
+    return f'Knowledge entry {entry_id} resolved {resolved} pending queries.'
+
+
+def schedule_answer_fanout(entry_id):
+    """Queue resolve_queries_answered_by once the knowledge entry is committed."""
+
+    def schedule():
+        # retry=False: with the broker down, fail fast rather than hold up the request.
+        try:
+            resolve_queries_answered_by.apply_async(args=[entry_id], retry=False)
+        except Exception as e:
+            # Matching queries stay pending until answered or expired.
+            logger.warning(f'Could not queue answer fan-out for knowledge entry {entry_id}: {e}')
+
+    transaction.on_commit(schedule)
+
+
 @shared_task
-def mark_unresolved_if_expired():
-    two_hours_ago = timezone.now() - timedelta(hours=2)
-    queries = QueryRequest.objects.filter(status=QueryRequestStatusOptions.PENDING, updated_at__lte=two_hours_ago)
+def mark_unresolved_if_expired(batch_size=None):
+    """
+    Reconciliation sweep for deadlines whose expire_query task never ran, e.g.
+    rows written with bulk_create or tasks lost with the broker.
+    """
+    batch_size = batch_size or getattr(settings, 'QUERY_EXPIRY_BATCH_SIZE', 500)
+    # Queries that expire while the sweep runs are left for the next run.
+    now = timezone.now()
+    started = time.monotonic()
+    expired_count = batches = 0
+    notifier = Notifier()
+
+    while True:
+        claimed = expire_query_batch(now, batch_size, notifier)
+        if not claimed:
+            break
+        batches += 1
+        expired_count += claimed
+        if claimed < batch_size:
+            break
+
+    elapsed = time.monotonic() - started
+    rate = expired_count / elapsed if elapsed else 0
+    message = (
+        f'Marked {expired_count} queries as unresolved in {batches} batches '
+        f'({elapsed:.2f}s, {rate:.0f} queries/s).'
+    )
+    logger.info(message)
+    return message
+
+
+@worker_process_init.connect
+def warm_up_knowledge_base(**kwargs):
+    try:
+        get_knowledge_base().warm_up()
+    except Exception:
+        logger.exception('Knowledge base warm-up failed in worker process.')
+
+
+@worker_process_init.connect
+def serve_worker_metrics(**kwargs):
+    port = getattr(settings, 'METRICS_WORKER_PORT', None)
+    if port:
+        start_metrics_server(port)
+
+
+# Start times of running tasks by task id, for callagent_task_seconds.
+_task_started = {}
 
-    updated_count = queries.update(status=QueryRequestStatusOptions.UNRESOLVED)
 
-    logger.info(f'Marked {updated_count} queries as unresolved.')
-    return f'Marked {updated_count} queries as unresolved.'
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_SECONDS.observe(time.perf_counter() - started, task.name, state or 'UNKNOWN')
+
+
+@shared_task
+def prune_change_events():
+    """Drop change events older than CHANGE_FEED_RETENTION."""
+    retention = getattr(settings, 'CHANGE_FEED_RETENTION', 7 * 24 * 60 * 60)
+    batch_size = getattr(settings, 'CHANGE_FEED_PRUNE_BATCH_SIZE', 1000)
+    deleted = prune_events(timezone.now() - timedelta(seconds=retention), batch_size)
+    logger.info(f'Pruned {deleted} change events older than {retention}s.')
+    return f'Pruned {deleted} change events.'
+
+
+@shared_task
+def reload_knowledge_base(tenant=None):
+    get_knowledge_base(tenant).reload()
+    logger.info(f'Reloaded knowledge base for tenant {tenant or "default"}.')
+    return f'Reloaded knowledge base for tenant {tenant or "default"}.'
+
 
+@shared_task(bind=True, max_retries=getattr(settings, 'NOTIFICATION_MAX_RETRIES', 5))
+def deliver_notifications(self, destination, payloads):
+    try:
+        send_batch(destination, payloads)
+    except Exception as e:
+        attempts = self.request.retries + 1
+        if self.request.retries >= self.max_retries:
+            record_dead_letters(destination, payloads, str(e), attempts=attempts)
+            return f'Dead-lettered {len(payloads)} notifications after {attempts} attempts.'
+        backoff = getattr(settings, 'NOTIFICATION_RETRY_BACKOFF', 2)
+        logger.warning(f'Webhook delivery to {destination} failed ({e}), retrying.')
+        raise self.retry(exc=e, countdown=backoff * (2 ** self.request.retries))
+    return f'Delivered {len(payloads)} notifications.'
@@ -1,12 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from src.views import KnowledgeBaseViewSet, QueryRequestViewSet
+from src import async_views
+from src.views import ChangeFeedViewSet, KnowledgeBaseViewSet, QueryRequestViewSet
 from rest_framework import routers
 
 router = routers.SimpleRouter()
 router.register(r"knowledge-base", KnowledgeBaseViewSet, basename="knowledge-base")
 router.register(r"query-request", QueryRequestViewSet, basename="query-request")
+router.register(r"changes", ChangeFeedViewSet, basename="changes")
+
+async_urlpatterns = [
+    path("knowledge-base/search-query/", async_views.search_query, name="async-search-query"),
+    path("knowledge-base/add-knowledge/", async_views.add_knowledge, name="async-add-knowledge"),
+    path("query-request/create-query/", async_views.create_query, name="async-create-query"),
+]
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/", include(async_urlpatterns)),
 ]
@@ -1,25 +1,162 @@
+import csv
+import io
+import json
+import os
 import traceback
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import timedelta
+from django.conf import settings
 from django.db import transaction
-from src.knowledge_base.knowledge import KnowledgeBase
+from django.http import HttpResponse
+from django.utils import timezone
+from src.changefeed import MAX_EVENTS_PER_PAGE, events_since
+from src.knowledge_base.bulk_import import import_knowledge, iter_records
+from src.knowledge_base.knowledge import get_knowledge_base, is_known_tenant
+from src.metrics import REGISTRY, metrics_allowed
 from src.model_helpers import KnowledgeBaseTypeOptions, QueryRequestStatusOptions, SourceOptions
-from src.models import QueryRequest, User
-from src.notification.notifier import Notifier
+from src.models import DEFAULT_TENANT, QueryRequest, User
+from src.query_dedup import create_or_attach_query, notify_query_answered
+from src.pagination import PaginationError, keyset_page, parse_fields, parse_limit, project
 from src.serializers import QueryRequestSerializer
 import logging
 
 logger = logging.getLogger("app_logger")
 
+KNOWLEDGE_REQUEST_FIELDS = [
+    "question",
+    "answer",
+    "source",
+    "type",
+    "description",
+    "description_key",
+    "query_request_id",
+]
+
+
+def parse_knowledge_request(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Turn an add-knowledge payload into add_or_update_knowledge arguments.
+    Returns the arguments and an error message if the payload is invalid.
+    """
+    knowledge_type = data.get("type", KnowledgeBaseTypeOptions.QUERY)
+    source = data.get("source", SourceOptions.SUPERVISOR)
+
+    if isinstance(knowledge_type, str):
+        try:
+            knowledge_type = KnowledgeBaseTypeOptions[knowledge_type.upper()]
+        except KeyError:
+            return {}, f"Invalid knowledge type: {knowledge_type}"
+
+    if isinstance(source, str):
+        try:
+            source = SourceOptions[source]
+        except KeyError:
+            return {}, f"Invalid source: {source}"
+
+    return {
+        "question": data.get("question", ""),
+        "answer": data.get("answer", ""),
+        "source": source,
+        "type": knowledge_type,
+        "description": data.get("description", {}),
+        "description_key": data.get("description_key", "info"),
+        "query_request_id": data.get("query_request_id", None),
+        **{k: v for k, v in data.items() if k not in KNOWLEDGE_REQUEST_FIELDS},
+    }, None
+
+
+def get_request_tenant(request, data: Optional[Dict[str, Any]] = None) -> str:
+    """The salon a request is for, from a `tenant` body field, ?tenant= or the X-Tenant header."""
+    return (
+        (data or {}).get("tenant")
+        or request.GET.get("tenant")
+        or request.headers.get("X-Tenant")
+        or DEFAULT_TENANT
+    )
+
+
+def get_answer_target(params: Dict[str, Any], tenant: str):
+    """
+    Return the KnowledgeBase an add-knowledge payload writes to and the query
+    request it answers, if any. A supervisor answer goes to the tenant of the
+    query it resolves rather than the one named by the request.
+    """
+    query_request_id = params["query_request_id"]
+    if not query_request_id:
+        return get_knowledge_base(tenant), None
+    query_request = QueryRequest.objects.select_related("user").get(id=query_request_id)
+    return get_knowledge_base(query_request.tenant), query_request
+
+
+def parse_query_expiry(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Turn the optional `sla_seconds` of a create-query payload into QueryRequest
+    arguments. Without it the default QUERY_REQUEST_SLA applies; it may not
+    exceed QUERY_REQUEST_MAX_SLA.
+    """
+    sla_seconds = data.get("sla_seconds")
+    if sla_seconds is None:
+        return {}, None
+    try:
+        sla_seconds = int(sla_seconds)
+    except (TypeError, ValueError):
+        return {}, "sla_seconds must be an integer."
+    if sla_seconds <= 0:
+        return {}, "sla_seconds must be positive."
+    max_sla = getattr(settings, "QUERY_REQUEST_MAX_SLA", 24 * 60 * 60)
+    if sla_seconds > max_sla:
+        return {}, f"sla_seconds may not exceed {max_sla}."
+    return {"expires_at": timezone.now() + timedelta(seconds=sla_seconds)}, None
+
+
+def query_request_response(query_request: QueryRequest, created: bool) -> Dict[str, Any]:
+    """Body of a create-query response; a repeated question returns the query it joined."""
+    if created:
+        return {"message": "Query request created successfully", "id": query_request.id}
+    return {
+        "message": "Question attached to a pending query request",
+        "id": query_request.id,
+        "deduplicated": True,
+        "follower_count": query_request.follower_count,
+    }
+
+
+def render_search_response(similar_entries: List[Dict[str, Any]], knowledge_base) -> bytes:
+    """
+    Encode a search-query response. The salon information is encoded once per
+    cache version, so only the similar entries need serializing here.
+    """
+    try:
+        system_info = knowledge_base.get_system_information_snapshot().json_bytes
+    except Exception as e:
+        logger.error(f"Error retrieving system information: {traceback.format_exc()}")
+        system_info = json.dumps(str(e)).encode("utf-8")
+
+    return b"".join(
+        [
+            b'{"similar_entries":',
+            json.dumps(similar_entries, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+            b',"salon_information":',
+            system_info,
+            b"}",
+        ]
+    )
+
 
 class KnowledgeBaseViewSet(viewsets.ViewSet):
     """ViewSet for interacting with the Knowledge Base."""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.knowledge_base = KnowledgeBase()
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.tenant = get_request_tenant(request)
+        # Imports may bring up a new salon; every other action needs a known one.
+        if self.action != "import_entries" and not is_known_tenant(self.tenant):
+            raise NotFound({"error": "Unknown tenant."})
+        self.knowledge_base = get_knowledge_base(self.tenant)
 
     @action(detail=False, methods=["get"], url_path="search-query")
     def search_query(self, request):
@@ -32,78 +169,101 @@ class KnowledgeBaseViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         similar_entries = self.knowledge_base._find_similar_entries(query)
+        return HttpResponse(
+            render_search_response(similar_entries, self.knowledge_base),
+            content_type="application/json",
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=False, methods=["post"], url_path="search-batch")
+    def search_batch(self, request):
+        """Search the knowledge base for many queries in a single pass."""
+        queries = request.data.get("queries", [])
+
+        if not queries or not isinstance(queries, list):
+            return Response(
+                {"error": "A non-empty list of queries is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not all(isinstance(query, str) for query in queries):
+            return Response(
+                {"error": "Every query must be a string."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = self.knowledge_base.find_similar_entries_batch(queries)
         system_info = self.knowledge_base.get_system_information()
 
         response_data = {
-            "similar_entries": similar_entries,
+            "results": [
+                {"query": query, "similar_entries": similar_entries}
+                for query, similar_entries in zip(queries, results)
+            ],
             "salon_information": system_info,
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
 
-    @action(detail=False, methods=["post"], url_path="add-knowledge")
-    @transaction.atomic()
-    def add_knowledge(self, request):
-        """Add or update knowledge in the knowledge base."""
+    @action(detail=False, methods=["post"], url_path="import-knowledge")
+    def import_entries(self, request):
+        """
+        Bulk import entries, either as {"entries": [...]} of add-knowledge
+        payloads or as an uploaded JSONL or CSV `file`.
+        """
         try:
-            data = request.data
-
-            question = data.get("question", "")
-            answer = data.get("answer", "")
-            source = data.get("source", SourceOptions.SUPERVISOR)
-            knowledge_type = data.get("type", KnowledgeBaseTypeOptions.QUERY)
-            description = data.get("description", {})
-            description_key = data.get("description_key", "info")
-            query_request_id = data.get("query_request_id", None)
-
-            if isinstance(knowledge_type, str):
-                try:
-                    knowledge_type = KnowledgeBaseTypeOptions[knowledge_type.upper()]
-                except KeyError:
+            upload = request.FILES.get("file")
+            if upload is not None:
+                file_format = request.data.get("format") or os.path.splitext(upload.name)[1].lstrip(".").lower()
+                if file_format not in ("jsonl", "csv"):
                     return Response(
-                        {"error": f"Invalid knowledge type: {knowledge_type}"},
+                        {"error": "format must be jsonl or csv."},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
-
-            if isinstance(source, str):
-                try:
-                    source = SourceOptions[source]
-                except KeyError:
+                records = iter_records(io.TextIOWrapper(upload, encoding="utf-8"), file_format)
+            else:
+                entries = request.data.get("entries")
+                if not entries or not isinstance(entries, list):
                     return Response(
-                        {"error": f"Invalid source: {source}"},
+                        {"error": "A non-empty list of entries or a file is required."},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
+                records = enumerate(entries, start=1)
 
-            success, result = self.knowledge_base.add_or_update_knowledge(
-                question=question,
-                answer=answer,
-                source=source,
-                type=knowledge_type,
-                description=description,
-                description_key=description_key,
-                query_request_id=query_request_id,
-                **{
-                    k: v
-                    for k, v in data.items()
-                    if k
-                    not in [
-                        "question",
-                        "answer",
-                        "source",
-                        "type",
-                        "description",
-                        "description_key",
-                        "query_request_id",
-                    ]
-                },
+            report = import_knowledge(records, tenant=self.tenant)
+            return Response(report.as_dict(), status=status.HTTP_200_OK)
+        except (UnicodeDecodeError, csv.Error, ValueError) as e:
+            logger.error(f"Error in import_entries :{traceback.format_exc()}")
+            return Response(
+                {"error": f"Could not read the import: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            logger.error(f"Error in import_entries :{traceback.format_exc()}")
+            return Response(
+                {"error": f"An error occurred: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @action(detail=False, methods=["post"], url_path="add-knowledge")
+    @transaction.atomic()
+    def add_knowledge(self, request):
+        """Add or update knowledge in the knowledge base."""
+        try:
+            data = request.data
+
+            params, error = parse_knowledge_request(data)
+            if error:
+                return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+            question = params["question"]
+            answer = params["answer"]
+            query_request_id = params["query_request_id"]
+
+            knowledge_base, query_request = get_answer_target(params, self.tenant)
+            success, result = knowledge_base.add_or_update_knowledge(**params)
+
             if success:
                 if query_request_id:
                     logger.info(f"query_request_id {query_request_id}")
-                    notifier = Notifier()
-                    user = QueryRequest.objects.get(id=query_request_id).user
-                    notifier.notify_customer(user.id, user.email, answer,question)
+                    notify_query_answered(query_request, answer, question)
                 return Response(
                     {"message": "Knowledge added/updated successfully", "id": result},
                     status=status.HTTP_201_CREATED,
@@ -139,6 +299,36 @@ class QueryRequestViewSet(viewsets.ModelViewSet):
     queryset = QueryRequest.objects.all()
     serializer_class = QueryRequestSerializer
 
+    # Response key -> ORM column for the listing endpoints' ?fields= selection.
+    LIST_FIELDS = {
+        "id": "id",
+        "user": "user_id",
+        "question": "question",
+        "status": "status",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+        "expires_at": "expires_at",
+        "follower_count": "follower_count",
+    }
+
+    def _list_query_requests(self, request, queryset):
+        """
+        List query requests as plain dicts, limited to ?fields= when given.
+        Passing ?limit= or ?cursor= switches to newest-first keyset pages of
+        the form {"results": [...], "next_cursor": ...}.
+        """
+        params = request.query_params
+        try:
+            fields = parse_fields(params.get("fields"), self.LIST_FIELDS)
+            if "limit" in params or "cursor" in params:
+                page = keyset_page(
+                    queryset, fields, params.get("cursor"), parse_limit(params.get("limit"))
+                )
+                return Response(page, status=status.HTTP_200_OK)
+        except PaginationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(project(queryset, fields), status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["post"], url_path="create-query")
     def create_query(self, request):
         """Create a new query request."""
@@ -152,11 +342,23 @@ class QueryRequestViewSet(viewsets.ModelViewSet):
                     {"error": "User ID and question are required."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            expiry, error = parse_query_expiry(data)
+            if error:
+                return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+            tenant = get_request_tenant(request, data)
+            if not is_known_tenant(tenant):
+                return Response({"error": "Unknown tenant."}, status=status.HTTP_404_NOT_FOUND)
             user = User.objects.filter(id=user_id).first()
-            query_request = QueryRequest.objects.create(user=user, question=question)
+            query_request, created = create_or_attach_query(
+                user,
+                question,
+                tenant,
+                expiry,
+                dedupe=data.get("dedupe", True) is not False,
+            )
             return Response(
-                {"message": "Query request created successfully", "id": query_request.id},
-                status=status.HTTP_201_CREATED,
+                query_request_response(query_request, created),
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
             )
         except Exception as e:
             logger.error(f"Error in create_query :{traceback.format_exc()}")
@@ -196,9 +398,7 @@ class QueryRequestViewSet(viewsets.ModelViewSet):
         """Get all query requests."""
         try:
             logger.info("Fetching all query requests")
-            query_requests = QueryRequest.objects.all()
-            serializer = self.get_serializer(query_requests, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self._list_query_requests(request, QueryRequest.objects.all())
         except Exception as e:
             return Response(
                 {"error": f"An error occurred: {str(e)}"},
@@ -211,8 +411,7 @@ class QueryRequestViewSet(viewsets.ModelViewSet):
             pending_queries = QueryRequest.objects.filter(
                 status=QueryRequestStatusOptions.PENDING
             )
-            serializer = self.get_serializer(pending_queries, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self._list_query_requests(request, pending_queries)
         except Exception as e:
             return Response(
                 {"error": f"An error occurred: {str(e)}"},
@@ -286,10 +485,43 @@ class QueryRequestViewSet(viewsets.ModelViewSet):
             unresolved_queries = QueryRequest.objects.filter(
                 status=QueryRequestStatusOptions.UNRESOLVED
             )
-            serializer = self.get_serializer(unresolved_queries, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self._list_query_requests(request, unresolved_queries)
+        except Exception as e:
+            return Response(
+                {"error": f"An error occurred: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+class ChangeFeedViewSet(viewsets.ViewSet):
+    """Incremental feed of QueryRequest and KnowledgeBase changes for the dashboard."""
+
+    def list(self, request):
+        """Get the change events after ?since=<seq>, oldest first."""
+        try:
+            params = request.query_params
+            since = int(params.get("since", 0))
+            limit = parse_limit(params["limit"]) if "limit" in params else MAX_EVENTS_PER_PAGE
+        except ValueError as e:
+            # PaginationError is a ValueError; anything else is a bad ?since=.
+            message = str(e) if isinstance(e, PaginationError) else "since must be an integer."
+            return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            events = events_since(since, min(limit, MAX_EVENTS_PER_PAGE))
+            return Response(
+                # Re-read events sit at or below `since`, so never move backwards.
+                {"events": events, "last_seq": max([since] + [event["seq"] for event in events])},
+                status=status.HTTP_200_OK,
+            )
         except Exception as e:
+            logger.error(f"Error in change feed: {traceback.format_exc()}")
             return Response(
                 {"error": f"An error occurred: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
\ No newline at end of file
+            )
+
+
+def metrics(request):
+    """Process metrics in the Prometheus text format, for METRICS_ALLOWED_IPS only."""
+    if not metrics_allowed(request.META.get("REMOTE_ADDR")):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")